@@ -54,6 +54,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'news.context_processors.categories',
             ],
         },
     },
@@ -84,9 +85,92 @@ ACCOUNT_FORMS = {
 }
 
 # 🆕 НАСТРОЙКИ EMAIL ДЛЯ СИСТЕМЫ ПОДПИСОК
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Для проверки на локальном SMTP-сервере:
+#   python -m aiosmtpd -n -l 127.0.0.1:1025
+#   EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend EMAIL_PORT=1025 python manage.py process_email_outbox
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
 SITE_URL = 'http://127.0.0.1:8000'
 
+# 🆕 ОЧЕРЕДЬ ИСХОДЯЩИХ ПИСЕМ (OUTBOX)
+# Публикация только записывает письма в очередь, отправляет их воркер:
+#   python manage.py process_email_outbox
+EMAIL_OUTBOX_WORKERS = 4              # параллельных отправителей в воркере
+EMAIL_OUTBOX_BATCH_SIZE = 500         # писем за один захват / bulk_create
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5         # после стольких ошибок письмо уходит в dead-letter
+EMAIL_OUTBOX_RETRY_BACKOFF = 60       # секунд до первого повтора, далее удваивается
+EMAIL_OUTBOX_MAX_BACKOFF = 3600       # верхняя граница задержки повтора
+EMAIL_OUTBOX_LOCK_TIMEOUT = 600       # через сколько секунд письмо зависшего воркера вернется в очередь
+EMAIL_DELIVERY_BATCH_SIZE = 50        # писем на одно соединение за один заход потока
+EMAIL_DELIVERY_MESSAGES_PER_CONNECTION = 200  # после стольких писем соединение переоткрывается
+
+# 🆕 ЛИМИТЫ ПОЧТОВОГО ПРОВАЙДЕРА (token bucket)
+# Бюджет общий для всех потоков одного процесса: при нескольких процессах
+# воркера лимиты нужно делить между ними. Пустое значение - без ограничений.
+EMAIL_RATE_LIMITS = {
+    'second': 10,
+    'minute': 500,
+    'hour': 20000,
+}
+EMAIL_THROTTLE_PAUSE = 30             # пауза (сек) после ответа провайдера 421/45x
+EMAIL_BULK_RATE_SHARE = 0.8           # доля бюджета для массовых писем, остальное гарантировано транзакционным
+EMAIL_OUTBOX_PRIORITY_INTERVAL = 10   # массовая пачка задерживает новые транзакционные письма не дольше (сек)
+
+# 🆕 БУФЕР ГОЛОСОВ
+# like/dislike копятся в памяти процесса и записываются раз в VOTE_FLUSH_INTERVAL секунд
+# (и при завершении процесса). 0 - каждый голос сразу пишется в БД.
+VOTE_FLUSH_INTERVAL = 5
+
+# 🆕 РЕЙТИНГ АВТОРОВ (LEADERBOARD)
+# Каждый процесс держит отсортированный рейтинг в памяти и перечитывает его из БД раз в интервал.
+# Голоса и пересчеты этого процесса видны сразу, изменения других процессов (воркеры gunicorn,
+# recompute_author_ratings) - с задержкой до LEADERBOARD_REFRESH_INTERVAL секунд.
+LEADERBOARD_REFRESH_INTERVAL = 60
+LEADERBOARD_SIZE = 20                 # авторов на странице рейтинга
+
+# 🆕 ДНЕВНОЙ ЛИМИТ НОВОСТЕЙ АВТОРА (счетчик в кэше на автора и день)
+NEWS_DAILY_LIMIT = 3
+
+# 🆕 КЭШ: поколения версионированного кэша, страницы, фрагменты, счетчики, квоты и группы.
+# Для нескольких воркеров (gunicorn -w N) и команд управления (backfill_post_previews,
+# recompute_author_ratings) кэш обязан быть общим: задайте REDIS_URL (нужен пакет redis),
+# иначе изменения, сделанные одним процессом, другие увидят только по истечении таймаутов.
+# Без REDIS_URL - кэш в памяти процесса: годится для runserver и тестов (один процесс).
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            # Страницы, фрагменты и счетчики не вытесняют друг друга при 300 записях по умолчанию
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
+    }
+
+# 🆕 ВЕРСИОНИРОВАННЫЙ КЭШ СТРАНИЦ (ленты, страницы новостей, главная)
+PAGE_CACHE_TIMEOUT = 300
+FRAGMENT_CACHE_TIMEOUT = 86400        # отрисованные строки постов; ключ меняется при сохранении поста
+
+# 🆕 СЧЕТЧИКИ (всего новостей, постов и подписчиков категории): точный пересчет раз в N секунд
+COUNT_RECOUNT_INTERVAL = 600
+
+# 🆕 ГРУППЫ ПОЛЬЗОВАТЕЛЯ (проверки "автор ли"): кэш имен групп, сбрасывается при изменении User.groups
+GROUP_CACHE_TIMEOUT = 60
+
+# 🆕 ЦЕНЗУРА: нежелательные слова для фильтра |censor (без учета регистра)
+# Цензор собирается один раз в одно регулярное выражение; список может содержать тысячи слов
+CENSOR_WORDS = [
+    'редиска', 'плохой',
+    'дурак',
+]
+
 
 DATABASES = {
     'default': {
@@ -10,7 +10,9 @@ from django.db.models import Count
 from django.core.mail import send_mass_mail
 from django.conf import settings
 
-from .models import Author, Category, Post, Comment, Subscription, ActivationToken, PostCategory
+from .models import Author, Category, Post, Comment, Subscription, ActivationToken, PostCategory, EmailOutbox
+from .services.outbox import OutboxService
+from .services.groups import GroupService
 import logging
 
 logger = logging.getLogger('news.admin')
@@ -171,7 +173,8 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ['title', 'content', 'author__user__username']
     list_select_related = ['author__user']
     inlines = [PostCategoryInline]
-    readonly_fields = ['created_at', 'updated_at']
+    # Рейтинг меняется только голосами: правка вручную разошлась бы с рейтингом автора
+    readonly_fields = ['rating', 'created_at', 'updated_at']
     date_hierarchy = 'created_at'
     actions = ['send_notifications_action']
     save_on_top = True
@@ -273,7 +276,7 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ['user', 'post_preview', 'created_at', 'rating', 'is_recent']
     list_filter = ['created_at', 'rating']
     search_fields = ['user__username', 'post__title', 'text']
-    readonly_fields = ['created_at']
+    readonly_fields = ['rating', 'created_at']
     date_hierarchy = 'created_at'
 
     def post_preview(self, obj):
@@ -343,6 +346,23 @@ class ActivationTokenAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('user')
 
 
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['to_email', 'subject', 'lane', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'lane', 'created_at']
+    search_fields = ['to_email', 'subject']
+    readonly_fields = ['created_at', 'sent_at', 'locked_by', 'locked_at', 'last_error']
+    date_hierarchy = 'created_at'
+    actions = ['requeue_action']
+
+    def requeue_action(self, request, queryset):
+        """Повторно ставит выбранные письма в очередь"""
+        count = OutboxService.requeue(queryset)
+        self.message_user(request, f"🔁 Возвращено в очередь писем: {count}")
+
+    requeue_action.short_description = "🔁 Вернуть в очередь отправки"
+
+
 # 🔄 РАСШИРЕННАЯ АДМИНКА ПОЛЬЗОВАТЕЛЕЙ
 class CustomUserAdmin(UserAdmin):
     list_display = UserAdmin.list_display + ('is_author', 'subscriptions_count', 'last_login_display')
@@ -350,7 +370,7 @@ class CustomUserAdmin(UserAdmin):
     inlines = [SubscriptionInline]  # Убрали UserPostsInline отсюда
 
     def is_author(self, obj):
-        return obj.groups.filter(name='authors').exists()
+        return GroupService.is_author(obj)
 
     is_author.boolean = True
     is_author.short_description = '👤 Автор'
@@ -0,0 +1,18 @@
+from django.utils.functional import SimpleLazyObject
+
+from .services.categories import CategorySummaryService
+
+
+def categories(request):
+    """Категории для меню и боковых панелей из кэшированной сводки.
+
+    Значения ленивые: страницы без меню категорий не обращаются к кэшу.
+    """
+    user = getattr(request, 'user', None)
+    return {
+        'categories': SimpleLazyObject(CategorySummaryService.summary),
+        'subscribed_category_ids': SimpleLazyObject(
+            lambda: CategorySummaryService.subscribed_ids(user)
+            if user is not None and user.is_authenticated else frozenset()
+        ),
+    }
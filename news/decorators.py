@@ -0,0 +1,73 @@
+from functools import wraps
+import hashlib
+import logging
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag, urlencode
+
+from .services.cache import page_cache
+
+logger = logging.getLogger('news.cache')
+
+
+def _page_name(request):
+    # Порядок параметров не влияет на ключ: ?a=1&b=2 и ?b=2&a=1 - одна страница
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    return 'anon_page:' + hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+
+
+def _respond(request, entry):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response.headers['ETag'] = entry['etag']
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    # Вошедшие пользователи получают другую страницу по тому же адресу
+    patch_vary_headers(response, ['Cookie'])
+    return get_conditional_response(request, etag=entry['etag'], response=response)
+
+
+def cache_anonymous_page(namespaces):
+    """Кэш целой страницы для анонимных GET-запросов с ETag (хэш содержимого).
+
+    Last-Modified не отдается: удаление поста, голос или комментарий меняют
+    страницу, не меняя updated_at показанных постов, а с точностью до секунды
+    If-Modified-Since вернул бы 304 со старым содержимым.
+
+    namespaces(request, *args, **kwargs) - пространства имен версионированного
+    кэша, от которых зависит страница: сигналы, увеличивающие их поколения,
+    сбрасывают и закэшированную страницу. Вошедшие пользователи, запросы с
+    сообщениями (messages) и ответы, ставящие cookie, кэш обходят.
+    Для классов: method_decorator(cache_anonymous_page(...), name='dispatch').
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD') or request.user.is_authenticated
+                    or 'messages' in request.COOKIES):
+                response = view(request, *args, **kwargs)
+                if request.user.is_authenticated:
+                    patch_cache_control(response, private=True)
+                return response
+
+            key = page_cache.make_key(_page_name(request), namespaces(request, *args, **kwargs))
+            entry = page_cache.get(key)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+                # Страницы с токеном CSRF или новыми cookie привязаны к посетителю
+                if (response.status_code != 200 or response.cookies
+                        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')):
+                    return response
+
+                entry = {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+                }
+                page_cache.set(key, entry)
+                logger.debug(f"🗄️ Страница сохранена в кэш: {request.get_full_path()}")
+
+            return _respond(request, entry)
+        return wrapper
+    return decorator
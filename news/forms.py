@@ -1,6 +1,6 @@
 from django import forms
 from .models import Post, Category
-from django.utils import timezone
+from .services.quota import NewsQuotaService
 from datetime import timedelta
 
 
@@ -19,25 +19,19 @@ class NewsCreateForm(forms.ModelForm):
             'content': forms.Textarea(attrs={'class': 'form-control', 'rows': 10}),
         }
 
+    def __init__(self, *args, user=None, **kwargs):
+        self.user = user
+        super().__init__(*args, **kwargs)
+
     def clean(self):
         cleaned_data = super().clean()
-        user = getattr(self, 'user', None)
-
-        if user and hasattr(user, 'author'):
-            today = timezone.now().date()
-            today_start = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.min.time()))
-
-            news_count_today = Post.objects.filter(
-                author=user.author,
-                post_type=Post.NEWS,
-                created_at__gte=today_start
-            ).count()
-
-            if news_count_today >= 3:
-                raise forms.ValidationError(
-                    f'Вы достигли лимита в 3 новости в сутки. '
-                    f'Сегодня вы уже опубликовали {news_count_today} новостей.'
-                )
+        user = self.user
+
+        if user and hasattr(user, 'author') and not NewsQuotaService.can_publish(user.author):
+            raise forms.ValidationError(
+                f'Вы достигли лимита в {NewsQuotaService.limit()} новости в сутки. '
+                f'Сегодня вы уже опубликовали {NewsQuotaService.used(user.author)} новостей.'
+            )
 
         return cleaned_data
 
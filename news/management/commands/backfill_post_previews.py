@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from news.models import Post
+from news.services.cache import page_cache, post_namespace, POSTS_NAMESPACE
+from news.services.censor import backfill_post_texts
+from news.services.fragments import FragmentCache
+import logging
+
+logger = logging.getLogger('news.management')
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохраненные заголовки и анонсы постов после цензуры (после смены CENSOR_WORDS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько постов читать и записывать за раз',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🚫 Пересчет заголовков и анонсов постов...")
+
+        started = time.perf_counter()
+        checked, changed_ids = backfill_post_texts(Post, chunk_size=max(1, options['chunk_size']))
+        elapsed = time.perf_counter() - started
+
+        if changed_ids:
+            # Закэшированные ленты и страницы показывают старые тексты
+            page_cache.bump(POSTS_NAMESPACE, *[post_namespace(pk) for pk in changed_ids])
+            # bulk_update не меняет updated_at, поэтому ключи фрагментов сбрасываются поколением
+            FragmentCache.invalidate_all()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Готово за {elapsed:.2f} сек: постов {checked}, изменено {len(changed_ids)}"
+            )
+        )
+        logger.info(f"Пересчет анонсов постов за {elapsed:.2f} сек: проверено {checked}, изменено {len(changed_ids)}")
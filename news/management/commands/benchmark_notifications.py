@@ -0,0 +1,138 @@
+import io
+import time
+import tracemalloc
+
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from news.models import EmailOutbox, Post, PostCategory
+from news.services.email_service import EmailService
+from news.services.load_generator import LoadGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк рассылок на временной тестовой базе (рабочая база не затрагивается): '
+        'писем/сек, число SQL-запросов и пик памяти для каждого сценария'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Количества подписчиков, для которых выполняется прогон',
+        )
+        parser.add_argument('--categories', type=int, default=5, help='Количество категорий')
+        parser.add_argument('--posts', type=int, default=20, help='Статей за неделю для дайджеста')
+        parser.add_argument('--workers', type=int, default=4, help='Отправителей в воркере очереди')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Лимиты провайдера отключены: измеряется собственная пропускная способность
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                EMAIL_RATE_LIMITS={},
+            ):
+                for size in options['sizes']:
+                    self.stdout.write(f"\n📈 Подписчиков: {size}")
+                    self.print_results(self.run_size(size, options))
+                    call_command('flush', interactive=False, verbosity=0)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_size(self, size, options):
+        seeded = LoadGenerator(seed=size).seed(
+            authors=5,
+            categories=options['categories'],
+            posts=options['posts'],
+            subscribers=size,
+            subscriptions_per_user=1,
+        )
+        author = seeded['authors'][0]
+        categories = seeded['categories']
+        results = []
+
+        news = self.make_post(author, Post.NEWS, categories)
+        results.append(self.measure('Post.send_notifications_to_subscribers', news.send_notifications_to_subscribers))
+        results.append(self.drain(options['workers']))
+
+        article = self.make_post(author, Post.ARTICLE, categories)
+        results.append(self.measure(
+            'EmailService.send_immediate_article_notification',
+            lambda: EmailService.send_immediate_article_notification(article)
+        ))
+        results.append(self.drain(options['workers']))
+
+        results.append(self.measure('EmailService.send_weekly_digest', EmailService.send_weekly_digest))
+        results.append(self.drain(options['workers']))
+        return results
+
+    @staticmethod
+    def make_post(author, post_type, categories):
+        post = Post.objects.create(
+            author=author,
+            post_type=post_type,
+            title='Бенчмарк: публикация во всех категориях',
+            content='Текст публикации для бенчмарка. ' * 40,
+        )
+        PostCategory.objects.bulk_create([PostCategory(post=post, category=category) for category in categories])
+        return Post.objects.select_related('author__user').get(pk=post.pk)
+
+    @staticmethod
+    def measure(name, func):
+        """Постановка писем в очередь: время, запросы и пик памяти"""
+        queued_before = EmailOutbox.objects.count()
+        tracemalloc.start()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'name': name,
+            'emails': EmailOutbox.objects.count() - queued_before,
+            'seconds': elapsed,
+            'queries': len(queries.captured_queries),
+            'peak': peak,
+        }
+
+    @staticmethod
+    def drain(workers):
+        """Доставка очереди воркером в locmem-бэкенд"""
+        mail.outbox = []
+        tracemalloc.start()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('process_email_outbox', '--once', '--workers', str(workers), stdout=io.StringIO())
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        delivered = len(mail.outbox)
+        mail.outbox = []
+        return {
+            'name': '  └ доставка (process_email_outbox)',
+            'emails': delivered,
+            'seconds': elapsed,
+            'queries': len(queries.captured_queries),
+            'peak': peak,
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"{'Сценарий':<52}{'писем':>9}{'сек':>9}{'писем/сек':>12}{'SQL':>7}{'пик МБ':>9}"
+        )
+        for row in results:
+            rate = row['emails'] / row['seconds'] if row['seconds'] else 0
+            self.stdout.write(
+                f"{row['name']:<52}{row['emails']:>9}{row['seconds']:>9.2f}{rate:>12.0f}"
+                f"{row['queries']:>7}{row['peak'] / 1024 / 1024:>9.1f}"
+            )
@@ -0,0 +1,152 @@
+from datetime import timedelta
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from news.services.delivery import DeliveryEngine
+from news.services.outbox import OutboxService
+from news.models import EmailOutbox
+from news.services.rate_limiter import get_bulk_rate_limiter, get_rate_limiter, is_throttling_error
+import logging
+
+logger = logging.getLogger('news.management')
+
+
+class Command(BaseCommand):
+    help = 'Фоновый воркер: отправляет письма из очереди (outbox) с повторами и dead-letter'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'EMAIL_OUTBOX_WORKERS', 4),
+            help='Количество параллельных отправителей',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 500),
+            help='Сколько писем захватывать из очереди за раз',
+        )
+        parser.add_argument(
+            '--messages-per-connection',
+            type=int,
+            default=getattr(settings, 'EMAIL_DELIVERY_MESSAGES_PER_CONNECTION', 200),
+            help='Сколько писем отправлять через одно соединение до переподключения',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Опустошить очередь и завершиться вместо ожидания новых писем',
+        )
+        parser.add_argument(
+            '--idle-sleep',
+            type=float,
+            default=5.0,
+            help='Пауза (сек) при пустой очереди',
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Показать глубину очереди и оценку времени ее отправки и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.show_status()
+            return
+
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+
+        self.stdout.write(f"📬 Воркер очереди писем запущен: отправителей={workers}, пачка={batch_size}")
+
+        totals = {'sent': 0, 'failed': 0}
+        try:
+            with DeliveryEngine(workers=workers, max_messages=options['messages_per_connection']) as engine:
+                while True:
+                    released = OutboxService.release_stale()
+                    if released:
+                        logger.warning(f"♻️ Возвращено в очередь зависших писем: {released}")
+
+                    batch = OutboxService.claim_batch(batch_size, bulk_limit=self.bulk_claim_limit(workers))
+                    if not batch:
+                        if options['once']:
+                            break
+                        time.sleep(options['idle_sleep'])
+                        continue
+
+                    sent, failed = self.process_batch(engine, batch)
+                    totals['sent'] += sent
+                    totals['failed'] += failed
+                    self.stdout.write(
+                        f"✉️ Пачка обработана: отправлено {sent}, ошибок {failed}. {self.describe_queue()}"
+                    )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("⏹️ Воркер остановлен"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Готово. Отправлено: {totals['sent']}, ошибок: {totals['failed']}"
+            )
+        )
+
+    def show_status(self):
+        limiter = get_rate_limiter()
+        rate = limiter.rate()
+        stats = OutboxService.stats()
+        self.stdout.write("📊 Очередь писем: " + ", ".join(f"{status}: {count}" for status, count in stats.items()))
+        self.stdout.write(
+            "🚦 Лимиты провайдера: "
+            + (", ".join(f"{limit}/{period}" for period, limit in limiter.limits.items()) or "без ограничений")
+            + (f" (~{rate:.1f} писем/сек)" if rate else "")
+        )
+        self.stdout.write(self.describe_queue())
+
+    @staticmethod
+    def bulk_claim_limit(workers):
+        """Сколько массовых писем брать за раз, чтобы вовремя вернуться к транзакционным"""
+        rate = get_bulk_rate_limiter().rate()
+        if not rate:
+            return None
+        interval = getattr(settings, 'EMAIL_OUTBOX_PRIORITY_INTERVAL', 10)
+        return max(workers, int(rate * interval))
+
+    @staticmethod
+    def describe_queue():
+        """Глубина очереди по полосам и оценка времени ее отправки при текущих лимитах"""
+        transactional = OutboxService.queue_depth(EmailOutbox.TRANSACTIONAL)
+        bulk = OutboxService.queue_depth(EmailOutbox.BULK)
+        # Массовые письма ограничены своей долей бюджета и ждут транзакционные
+        drain = max(
+            get_rate_limiter().estimate_drain_time(transactional + bulk),
+            get_bulk_rate_limiter().estimate_drain_time(bulk)
+        )
+        return (
+            f"⏳ В очереди {transactional + bulk} (транзакционных {transactional}, массовых {bulk}), "
+            f"оценка отправки {timedelta(seconds=round(drain))}"
+        )
+
+    @staticmethod
+    def process_batch(engine, batch):
+        """Отправляет пачку через пул соединений; статусы в БД обновляет основной поток"""
+        results = engine.send(batch)
+
+        sent_ids = []
+        throttled_ids = []
+        failed = 0
+        for row, error in zip(batch, results):
+            if error is None:
+                sent_ids.append(row.pk)
+            elif is_throttling_error(error):
+                throttled_ids.append(row.pk)
+            else:
+                failed += 1
+                OutboxService.mark_failed(row, error)
+
+        OutboxService.mark_sent(sent_ids)
+        if throttled_ids:
+            OutboxService.mark_throttled(throttled_ids, engine.throttle_pause)
+            logger.warning(f"🐢 Отложено из-за лимитов провайдера: {len(throttled_ids)}")
+        return len(sent_ids), failed + len(throttled_ids)
+
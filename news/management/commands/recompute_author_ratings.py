@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from news.services.ratings import RatingService, RATING_CHUNK_SIZE
+import logging
+
+logger = logging.getLogger('news.management')
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересчитывает рейтинги авторов сгруппированными агрегатами и bulk_update'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--author-ids',
+            type=int,
+            nargs='+',
+            default=None,
+            help='Пересчитать только этих авторов (id)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=RATING_CHUNK_SIZE,
+            help='Сколько авторов пересчитывать и записывать за раз',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("⭐ Пересчет рейтингов авторов...")
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            result = RatingService.recompute(
+                author_ids=options['author_ids'],
+                chunk_size=max(1, options['chunk_size'])
+            )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Готово за {elapsed:.2f} сек: авторов {result['processed']}, "
+                f"изменено {result['updated']}, SQL-запросов {len(queries.captured_queries)}"
+            )
+        )
+        logger.info(f"Пересчет рейтингов за {elapsed:.2f} сек: {result}")
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from news.models import Post
+from news.services.load_generator import LoadGenerator
+import logging
+
+logger = logging.getLogger('news.management')
+
+
+class Command(BaseCommand):
+    help = 'Наполняет базу синтетическими авторами, постами, категориями, подписками и комментариями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=50, help='Количество авторов')
+        parser.add_argument('--categories', type=int, default=20, help='Количество категорий')
+        parser.add_argument('--posts', type=int, default=1000, help='Количество постов')
+        parser.add_argument('--subscribers', type=int, default=10000, help='Количество подписчиков')
+        parser.add_argument(
+            '--subscriptions-per-user',
+            type=int,
+            default=2,
+            help='На сколько категорий подписан каждый подписчик',
+        )
+        parser.add_argument('--comments', type=int, default=5000, help='Количество комментариев')
+        parser.add_argument(
+            '--post-type',
+            choices=[Post.ARTICLE, Post.NEWS],
+            default=Post.ARTICLE,
+            help='Тип создаваемых постов',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Размер пачки bulk_create')
+        parser.add_argument('--seed', type=int, default=None, help='Seed генератора случайных чисел')
+
+    def handle(self, *args, **options):
+        self.stdout.write("🌱 Наполнение базы синтетическими данными...")
+
+        started = time.perf_counter()
+        result = LoadGenerator(batch_size=options['batch_size'], seed=options['seed']).seed(
+            authors=options['authors'],
+            categories=options['categories'],
+            posts=options['posts'],
+            subscribers=options['subscribers'],
+            subscriptions_per_user=options['subscriptions_per_user'],
+            comments=options['comments'],
+            post_type=options['post_type'],
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Создано за {elapsed:.1f} сек: авторов {len(result['authors'])}, "
+                f"категорий {len(result['categories'])}, постов {result['posts']}, "
+                f"подписчиков {result['subscribers']}, подписок {result['subscriptions']}, "
+                f"комментариев {result['comments']}"
+            )
+        )
+        logger.info(f"Синтетические данные созданы за {elapsed:.1f} сек")
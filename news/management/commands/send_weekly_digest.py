@@ -1,5 +1,15 @@
-from django.core.management.base import BaseCommand
-from news.services.email_service import EmailService
+from datetime import date, timedelta
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from news.services.digest import DigestPlanner
+from news.services.email_service import EmailService, DIGEST_CHUNK_SIZE
+from news.services.rate_limiter import get_rate_limiter
 import logging
 
 logger = logging.getLogger('news.management')
@@ -14,9 +24,68 @@ class Command(BaseCommand):
             action='store_true',
             help='Показать что будет отправлено без фактической отправки',
         )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            help='Скорость отправки (писем/сек) для оценки времени в режиме --dry-run; '
+                 'по умолчанию оценка строится по лимитам EMAIL_RATE_LIMITS',
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=1,
+            help='На сколько шардов (диапазонов user_id) разделить подписки',
+        )
+        parser.add_argument(
+            '--shard',
+            type=int,
+            default=0,
+            help='Номер обрабатываемого шарда (с нуля)',
+        )
+        parser.add_argument(
+            '--low',
+            type=int,
+            default=None,
+            help='Нижняя граница user_id шарда (включительно); задается при запуске с --workers',
+        )
+        parser.add_argument(
+            '--high',
+            type=int,
+            default=None,
+            help='Верхняя граница user_id шарда (не включительно); задается при запуске с --workers',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Запустить N процессов, каждый со своим шардом',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DIGEST_CHUNK_SIZE,
+            help='Размер пачки подписок, фиксируемой в одной транзакции',
+        )
+        parser.add_argument(
+            '--week',
+            type=date.fromisoformat,
+            default=None,
+            help='Неделя рассылки (понедельник, YYYY-MM-DD); по умолчанию текущая',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
+        shards = options['shards']
+        shard = options['shard']
+
+        if shards < 1 or not 0 <= shard < shards:
+            raise CommandError('Номер шарда должен быть в диапазоне 0..shards-1')
+        # Явные границы (от run_workers) важнее пересчета диапазона по текущим подпискам
+        if options['low'] is not None or options['high'] is not None:
+            options['bounds'] = (options['low'], options['high'])
+        else:
+            options['bounds'] = None
 
         self.stdout.write("📊 Запуск отправки еженедельных дайджестов...")
 
@@ -24,15 +93,25 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.WARNING("🔶 РЕЖИМ ПРОСМОТРА: письма не будут отправлены")
             )
-            # Здесь можно добавить логику предпросмотра
+            self.show_plan(options)
+            return
+
+        if options['workers'] > 1:
+            self.run_workers(options)
             return
 
         try:
-            result = EmailService.send_weekly_digest()
+            result = EmailService.send_weekly_digest(
+                shards=shards,
+                shard=shard,
+                chunk_size=options['chunk_size'],
+                week=options['week'],
+                bounds=options['bounds']
+            )
 
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"✅ Еженедельные дайджесты отправлены! "
+                    f"✅ Еженедельные дайджесты поставлены в очередь (шард {shard + 1}/{shards})! "
                     f"Успешно: {result['sent']}, Ошибок: {result['errors']}"
                 )
             )
@@ -40,7 +119,80 @@ class Command(BaseCommand):
             logger.info(f"Еженедельные дайджесты отправлены: {result}")
 
         except Exception as e:
+            logger.error(f"Ошибка отправки еженедельных дайджестов: {e}")
+            raise CommandError(f"❌ Ошибка при отправке дайджестов: {e}")
+
+    def show_plan(self, options):
+        """Выполняет планирование рассылки и печатает оценку объема и времени"""
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            report = EmailService.preview_weekly_digest(
+                shards=options['shards'],
+                shard=options['shard'],
+                week=options['week'],
+                bounds=options['bounds']
+            )
+        elapsed = time.perf_counter() - started
+
+        rate = options['rate']
+        if rate:
+            send_seconds = report['subscriptions'] / rate
+            rate_label = f"{rate:g} писем/сек"
+        else:
+            # Учитываются все бюджеты провайдера: часовой лимит может быть строже секундного
+            limiter = get_rate_limiter()
+            send_seconds = limiter.estimate_drain_time(report['subscriptions'])
+            rate_label = ", ".join(f"{limit}/{period}" for period, limit in limiter.limits.items()) or "без ограничений"
+
+        self.stdout.write(f"📅 Неделя: {report['week'].isoformat()}")
+        self.stdout.write(f"📩 Подписок к отправке: {report['subscriptions']}")
+        self.stdout.write(f"👥 Различных получателей: {report['recipients']}")
+        self.stdout.write("📂 Статей по категориям:")
+        for category in report['categories']:
             self.stdout.write(
-                self.style.ERROR(f"❌ Ошибка при отправке дайджестов: {e}")
+                f"   • {category['name']}: статей {category['articles']}, "
+                f"подписок {category['subscriptions']}, ~{category['message_bytes'] / 1024:.1f} КБ на письмо"
             )
-            logger.error(f"Ошибка отправки еженедельных дайджестов: {e}")
\ No newline at end of file
+        self.stdout.write(f"📦 Оценка объема: {report['bytes'] / 1024 / 1024:.2f} МБ")
+        self.stdout.write(
+            f"⏱️ Оценка времени отправки при {rate_label}: {timedelta(seconds=round(send_seconds))}"
+        )
+        self.stdout.write(
+            f"🔎 Планирование: {len(queries.captured_queries)} SQL-запросов за {elapsed * 1000:.0f} мс"
+        )
+
+    def run_workers(self, options):
+        """Запускает по процессу на шард и ждет их завершения"""
+        workers = options['workers']
+        # Все процессы должны писать в журнал одну и ту же неделю
+        week = options['week'] or DigestPlanner.week_key()
+
+        # Границы шардов считаются один раз: процессы не пересчитывают их по изменившимся подпискам
+        ranges = DigestPlanner.shard_ranges(workers)
+
+        self.stdout.write(f"🚀 Запуск {workers} процессов, неделя {week.isoformat()}")
+
+        processes = []
+        for shard, (low, high) in enumerate(ranges):
+            command = [
+                sys.executable, str(settings.BASE_DIR / 'manage.py'), 'send_weekly_digest',
+                '--shards', str(workers),
+                '--shard', str(shard),
+                '--chunk-size', str(options['chunk_size']),
+                '--week', week.isoformat(),
+            ]
+            if low is not None:
+                command += ['--low', str(low)]
+            if high is not None:
+                command += ['--high', str(high)]
+            processes.append(subprocess.Popen(command))
+
+        failed = [shard for shard, process in enumerate(processes) if process.wait() != 0]
+
+        if failed:
+            raise CommandError(
+                f"❌ Шарды завершились с ошибкой: {failed}. "
+                f"Перезапустите команду - уже обработанные подписки будут пропущены."
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Все {workers} шардов обработаны"))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from news.models import Author
+from news.services.ratings import RatingService
+import logging
+
+logger = logging.getLogger('news.management')
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сохраненные рейтинги авторов с полным пересчетом и показывает расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Исправить найденные расхождения',
+        )
+        parser.add_argument(
+            '--author-ids',
+            type=int,
+            nargs='+',
+            default=None,
+            help='Проверить только этих авторов (id)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔎 Сверка рейтингов авторов...")
+
+        checked, drift = RatingService.find_drift(author_ids=options['author_ids'])
+        drifted = len(drift)
+        usernames = dict(
+            Author.objects.filter(pk__in=[pk for pk, _, _ in drift[:100]]).values_list('pk', 'user__username')
+        )
+
+        # Подробно показываются первые 100 расхождений
+        for pk, stored, expected in drift[:100]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ {usernames[pk]}: сохранено {stored}, "
+                    f"пересчитано {expected} (расхождение {stored - expected:+d})"
+                )
+            )
+
+        if drift and options['fix']:
+            RatingService.recompute(author_ids=options['author_ids'])
+
+        logger.info(f"Сверка рейтингов: проверено {checked}, расхождений {drifted}")
+
+        if drifted and not options['fix']:
+            self.stdout.write(
+                self.style.WARNING(f"⚠️ Проверено авторов: {checked}, расхождений: {drifted}. Исправить: --fix")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ Проверено авторов: {checked}, расхождений: {drifted}")
+            )
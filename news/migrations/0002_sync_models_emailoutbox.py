@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_missing_schema(apps, schema_editor):
+    """Создает таблицы и поля синхронизированных моделей, если их еще нет.
+
+    В рабочих базах они уже созданы миграциями, которых больше нет в репозитории,
+    поэтому схема меняется только в новых (в том числе тестовых) базах.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for model_name in ('ActivationToken', 'Subscription'):
+            model = apps.get_model('news', model_name)
+            if model._meta.db_table not in tables:
+                schema_editor.create_model(model)
+
+        Post = apps.get_model('news', 'Post')
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, Post._meta.db_table)}
+        for field_name in ('notifications_sent', 'updated_at'):
+            field = Post._meta.get_field(field_name)
+            if field.column not in columns:
+                schema_editor.add_field(Post, field)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Эти модели и поля уже есть в существующих базах: меняем только состояние миграций
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterModelOptions(
+                    name='comment',
+                    options={'ordering': ['-created_at']},
+                ),
+                migrations.AlterModelOptions(
+                    name='post',
+                    options={'ordering': ['-created_at']},
+                ),
+                migrations.AlterModelOptions(
+                    name='postcategory',
+                    options={'verbose_name_plural': 'Post Categories'},
+                ),
+                migrations.AddField(
+                    model_name='post',
+                    name='notifications_sent',
+                    field=models.BooleanField(default=False),
+                ),
+                migrations.AddField(
+                    model_name='post',
+                    name='updated_at',
+                    field=models.DateTimeField(auto_now=True),
+                ),
+                migrations.CreateModel(
+                    name='ActivationToken',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('token', models.CharField(max_length=64, unique=True)),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('activated', models.BooleanField(default=False)),
+                        ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                ),
+                migrations.CreateModel(
+                    name='Subscription',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('subscribed_at', models.DateTimeField(auto_now_add=True)),
+                        ('last_weekly_sent', models.DateTimeField(blank=True, null=True)),
+                        ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.category')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'unique_together': {('user', 'category')},
+                    },
+                ),
+                migrations.AddField(
+                    model_name='category',
+                    name='subscribers',
+                    field=models.ManyToManyField(blank=True, related_name='subscribed_categories', through='news.Subscription', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_missing_schema, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to_email', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('html_body', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('dead', 'Не доставлено')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('locked_by', models.CharField(blank=True, max_length=32)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx')],
+            },
+        ),
+    ]
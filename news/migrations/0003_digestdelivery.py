@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0002_sync_models_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_deliveries', to='news.subscription')),
+            ],
+            options={
+                'unique_together': {('subscription', 'week')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_digestdelivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='lane',
+            field=models.CharField(choices=[('transactional', 'Транзакционные'), ('bulk', 'Массовые')], default='bulk', max_length=13),
+        ),
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(fields=['status', 'lane', 'next_attempt_at'], name='outbox_status_lane_next_idx'),
+        ),
+    ]
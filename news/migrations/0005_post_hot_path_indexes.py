@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_emailoutbox_lane'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['post_type', '-created_at'], name='post_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'post_type', 'created_at'], name='post_author_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcategory',
+            index=models.Index(fields=['category', 'post'], name='postcategory_category_post_idx'),
+        ),
+    ]
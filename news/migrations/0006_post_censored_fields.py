@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    from news.services.censor import backfill_post_texts
+
+    backfill_post_texts(apps.get_model('news', 'Post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_post_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='censored_preview',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='censored_title',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -2,9 +2,11 @@ from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMix
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
-from django.utils import timezone
-from datetime import datetime
-from .models import Post
+from django.http import Http404
+from .pagination import CountedPaginator, CursorPage, CursorPaginator, InvalidCursor
+from .services.quota import NewsQuotaService
+from .services.groups import GroupService
+from .services.cache import page_cache, POSTS_NAMESPACE
 
 
 class AuthRequiredMixin(LoginRequiredMixin):
@@ -32,8 +34,7 @@ class AuthorRequiredMixin(UserPassesTestMixin):
     permission_denied_message = "Только авторы могут создавать и редактировать контент."
 
     def test_func(self):
-        return (self.request.user.is_authenticated and
-                self.request.user.groups.filter(name='authors').exists())
+        return GroupService.is_author(self.request.user)
 
     def handle_no_permission(self):
         messages.error(self.request, self.permission_denied_message)
@@ -41,30 +42,90 @@ class AuthorRequiredMixin(UserPassesTestMixin):
 
 
 class NewsLimitMixin:
-    """Миксин для ограничения создания новостей (3 в сутки)"""
+    """Миксин для ограничения создания новостей (NEWS_DAILY_LIMIT в сутки)"""
 
     def dispatch(self, request, *args, **kwargs):
         if request.method == 'POST':
             user = request.user
-            if hasattr(user, 'author'):
-                today = timezone.now().date()
-                today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-
-                news_count_today = Post.objects.filter(
-                    author=user.author,
-                    post_type=Post.NEWS,
-                    created_at__gte=today_start
-                ).count()
-
-                if news_count_today >= 3:
-                    raise PermissionDenied(
-                        f'Вы достигли лимита в 3 новости в сутки. '
-                        f'Сегодня вы уже опубликовали {news_count_today} новостей.'
-                    )
+            if hasattr(user, 'author') and not NewsQuotaService.can_publish(user.author):
+                raise PermissionDenied(
+                    f'Вы достигли лимита в {NewsQuotaService.limit()} новости в сутки. '
+                    f'Сегодня вы уже опубликовали {NewsQuotaService.used(user.author)} новостей.'
+                )
 
         return super().dispatch(request, *args, **kwargs)
 
 
+class CursorPaginationMixin:
+    """Keyset-пагинация ListView: ?cursor=<токен> вместо ?page=N.
+
+    Старые ссылки с ?page=N по-прежнему обслуживает обычный Paginator.
+    """
+    cursor_kwarg = 'cursor'
+    cursor_ordering = ('-created_at', '-pk')
+
+    def uses_cursor_pagination(self):
+        return self.page_kwarg not in self.request.GET
+
+    def get_cursor_paginator(self, queryset, per_page):
+        return CursorPaginator(queryset, per_page, ordering=self.cursor_ordering)
+
+    def get_cursor_page(self, paginator, cursor):
+        try:
+            return paginator.page(cursor)
+        except InvalidCursor:
+            raise Http404('Неверный курсор страницы')
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.uses_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        page = self.get_cursor_page(paginator, self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class CachedPaginationMixin:
+    """Кэширует число объектов и содержимое страниц ListView.
+
+    Число берется из get_total_count() (например, счетчик CountService),
+    по умолчанию - из версионированного кэша.
+    """
+    cache_name = None
+    cache_namespaces = [POSTS_NAMESPACE]
+    paginator_class = CountedPaginator
+
+    def get_cache_name(self):
+        return self.cache_name or self.__class__.__name__
+
+    def get_total_count(self, queryset):
+        return page_cache.get_or_set(f'{self.get_cache_name()}:count', self.cache_namespaces, queryset.count)
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(queryset, per_page, count=self.get_total_count(queryset), **kwargs)
+
+    def get_cursor_paginator(self, queryset, per_page):
+        paginator = super().get_cursor_paginator(queryset, per_page)
+        paginator.count = self.get_total_count(queryset)
+        return paginator
+
+    def get_cursor_page(self, paginator, cursor):
+        # Страница курсора хранит только список объектов и токены - кэшируется целиком
+        return page_cache.get_or_set(
+            f'{self.get_cache_name()}:cursor:{cursor or ""}', self.cache_namespaces,
+            lambda: super(CachedPaginationMixin, self).get_cursor_page(paginator, cursor)
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        if isinstance(page, CursorPage):
+            return paginator, page, object_list, is_paginated
+        page.object_list = page_cache.get_or_set(
+            f'{self.get_cache_name()}:page:{page.number}', self.cache_namespaces, lambda: list(object_list)
+        )
+        return paginator, page, page.object_list, is_paginated
+
+
 class OwnerRequiredMixin(UserPassesTestMixin):
     """Миксин для проверки владения объектом"""
     permission_denied_message = "Вы можете редактировать только свой собственный контент."
@@ -1,10 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
 from django.utils.crypto import get_random_string
 from django.utils import timezone
-from datetime import timedelta, datetime
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from datetime import timedelta
 from django.conf import settings
 from django.core.exceptions import ValidationError
 
@@ -13,39 +12,79 @@ class Author(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     rating = models.IntegerField(default=0)
 
+    # Рейтинг = рейтинг постов * 3 + рейтинг комментариев автора + рейтинг комментариев к его постам
+    POST_RATING_WEIGHT = 3
+
+    def compute_rating(self):
+        """Расчет рейтинга автора агрегатами в БД (три запроса независимо от объема)"""
+        post_rating = self.post_set.aggregate(total=Sum('rating'))['total'] or 0
+        comment_rating = Comment.objects.filter(user_id=self.user_id).aggregate(total=Sum('rating'))['total'] or 0
+        comments_to_posts_rating = Comment.objects.filter(
+            post__author=self
+        ).aggregate(total=Sum('rating'))['total'] or 0
+        return post_rating * self.POST_RATING_WEIGHT + comment_rating + comments_to_posts_rating
+
     def update_rating(self):
-        """Расчет рейтинга автора на основе всех его постов и комментариев"""
-        # Рейтинг постов автора
-        post_rating = sum(post.rating for post in self.post_set.all())
+        """Полный пересчет рейтинга автора"""
+        from .services.leaderboard import leaderboard
 
-        # Рейтинг комментариев автора
-        comment_rating = sum(comment.rating for comment in Comment.objects.filter(user=self.user))
+        self.rating = self.compute_rating()
+        self.save(update_fields=['rating'])
+        transaction.on_commit(leaderboard.invalidate)
 
-        # Рейтинг комментариев к постам автора
-        comments_to_posts_rating = sum(
-            comment.rating for post in self.post_set.all()
-            for comment in post.comment_set.all()
-        )
+    @staticmethod
+    def apply_rating_delta(delta, author_id=None, user_id=None, post_id=None):
+        """Атомарно меняет рейтинг автора (по id автора, пользователя или поста) без чтения"""
+        from .services.leaderboard import leaderboard
 
-        self.rating = post_rating * 3 + comment_rating + comments_to_posts_rating
-        self.save()
+        if not delta:
+            return
+        if author_id is not None:
+            author_ids = [author_id]
+        else:
+            # id автора нужен рейтингу в памяти: без него пришлось бы перечитывать всю таблицу
+            if user_id is not None:
+                authors = Author.objects.filter(user_id=user_id)
+            else:
+                authors = Author.objects.filter(post__id=post_id)
+            author_ids = list(authors.values_list('pk', flat=True))
+            if not author_ids:
+                return
+        Author.objects.filter(pk__in=author_ids).update(rating=F('rating') + delta)
+        transaction.on_commit(lambda: leaderboard.apply_deltas(dict.fromkeys(author_ids, delta)))
 
     def get_news_count_today(self):
         """Количество новостей, опубликованных автором сегодня"""
-        today_start = timezone.make_aware(datetime.combine(timezone.now().date(), datetime.min.time()))
-        return self.post_set.filter(
-            post_type=Post.NEWS,
-            created_at__gte=today_start
-        ).count()
+        from .services.quota import NewsQuotaService
+        return NewsQuotaService.used(self)
 
     def can_publish_news(self):
         """Проверяет, может ли автор опубликовать еще новость сегодня"""
-        return self.get_news_count_today() < 3
+        from .services.quota import NewsQuotaService
+        return NewsQuotaService.can_publish(self)
 
     def __str__(self):
         return self.user.username
 
 
+def exclude_rating(instance, save_kwargs):
+    """Убирает rating из сохранения существующей строки поста или комментария.
+
+    Рейтинг меняется только атомарными приращениями (vote, буфер голосов);
+    копия, загруженная до голосования, иначе записала бы старое значение
+    поверх нового, а рейтинг автора остался бы прежним. Возвращает
+    update_fields, с которыми будет сохранена строка, или None для вставки.
+    """
+    if instance._state.adding or save_kwargs.get('force_insert'):
+        return None
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is None:
+        update_fields = [field.name for field in instance._meta.concrete_fields if not field.primary_key]
+    update_fields = [name for name in update_fields if name != 'rating']
+    save_kwargs['update_fields'] = update_fields
+    return update_fields
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     subscribers = models.ManyToManyField(
@@ -56,7 +95,8 @@ class Category(models.Model):
     )
 
     def get_subscribers_count(self):
-        return self.subscribers.count()
+        from .services.counts import CountService
+        return CountService.category_subscribers(self.pk)
 
     def get_weekly_posts(self):
         """Возвращает посты за последнюю неделю"""
@@ -87,6 +127,19 @@ class Subscription(models.Model):
         return timezone.now() - self.last_weekly_sent > timedelta(days=7)
 
 
+class DigestDelivery(models.Model):
+    """Журнал еженедельных рассылок: одна строка на (подписка, неделя)"""
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='digest_deliveries')
+    week = models.DateField()  # понедельник недели рассылки
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['subscription', 'week']
+
+    def __str__(self):
+        return f"{self.subscription_id} - {self.week}"
+
+
 class Post(models.Model):
     ARTICLE = 'AR'
     NEWS = 'NW'
@@ -105,96 +158,172 @@ class Post(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     # 🆕 Поле для отслеживания отправки уведомлений
     notifications_sent = models.BooleanField(default=False)
+    # 🆕 Заголовок и анонс после цензуры: вычисляются при сохранении, списки и письма не читают content
+    censored_title = models.CharField(max_length=255, blank=True, default='', editable=False)
+    censored_preview = models.TextField(blank=True, default='', editable=False)
 
     class Meta:
         ordering = ['-created_at']  # Сортировка по умолчанию - новые сначала
+        indexes = [
+            # Списки и поиск: фильтр по типу и сортировка по дате; выборка статей для дайджеста
+            models.Index(fields=['post_type', '-created_at'], name='post_type_created_idx'),
+            # Дневной лимит новостей автора
+            models.Index(fields=['author', 'post_type', 'created_at'], name='post_author_type_created_idx'),
+        ]
 
     def clean(self):
         """Валидация при создании/редактировании поста"""
         if self.post_type == self.NEWS and self.pk is None:
             # Проверяем только для новых новостей
-            if not self.author.can_publish_news():
-                news_count = self.author.get_news_count_today()
+            from .services.quota import NewsQuotaService
+            used = NewsQuotaService.used(self.author)
+            if used >= NewsQuotaService.limit():
                 raise ValidationError(
-                    f'Вы не можете публиковать более 3 новостей в сутки. '
-                    f'Сегодня вы уже опубликовали {news_count} новостей.'
+                    f'Вы не можете публиковать более {NewsQuotaService.limit()} новостей в сутки. '
+                    f'Сегодня вы уже опубликовали {used} новостей.'
                 )
 
     def save(self, *args, **kwargs):
         """Переопределяем save для вызова валидации"""
         self.clean()
-        super().save(*args, **kwargs)
+        self.update_censored_fields(kwargs)
+        update_fields = exclude_rating(self, kwargs)
+        if update_fields is None or 'author' not in update_fields:
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            stored = Post.objects.filter(pk=self.pk).values_list('author_id', 'rating').first()
+            super().save(*args, **kwargs)
+            if stored and stored[0] != self.author_id:
+                # Смена автора переносит вклад поста и комментариев к нему в рейтинг нового автора
+                moved = stored[1] * Author.POST_RATING_WEIGHT + (
+                    Comment.objects.filter(post_id=self.pk).aggregate(total=Sum('rating'))['total'] or 0
+                )
+                Author.apply_rating_delta(-moved, author_id=stored[0])
+                Author.apply_rating_delta(moved, author_id=self.author_id)
+
+    def update_censored_fields(self, save_kwargs=None):
+        """Пересчитывает censored_title/censored_preview по title и content"""
+        from .services.censor import censor_text, make_preview
+
+        update_fields = (save_kwargs or {}).get('update_fields')
+        deferred = self.get_deferred_fields()
+        changed = []
+        if 'title' not in deferred and (update_fields is None or 'title' in update_fields):
+            self.censored_title = censor_text(self.title)
+            changed.append('censored_title')
+        # Пост, загруженный без content (списки), не перечитывает его ради анонса
+        if 'content' not in deferred and (update_fields is None or 'content' in update_fields):
+            self.censored_preview = censor_text(make_preview(self.content))
+            changed.append('censored_preview')
+        if update_fields is not None and changed:
+            save_kwargs['update_fields'] = set(update_fields) | set(changed)
 
     def __str__(self):
         return self.title
 
     def preview(self):
-        return self.content[:124] + '...' if len(self.content) > 124 else self.content
+        if self.censored_preview or 'content' in self.get_deferred_fields():
+            return self.censored_preview
+        from .services.censor import censor_text, make_preview
+        return censor_text(make_preview(self.content))
 
     def like(self):
-        self.rating += 1
-        self.save()
+        from .services.votes import vote_buffer
+        vote_buffer.add(self, 1)
 
     def dislike(self):
-        self.rating -= 1
-        self.save()
+        from .services.votes import vote_buffer
+        vote_buffer.add(self, -1)
 
-    def send_notifications_to_subscribers(self):
-        """Отправляет уведомления подписчикам категорий поста"""
-        if self.notifications_sent:
-            return
+    def vote(self, delta):
+        """Меняет рейтинг поста и рейтинг его автора атомарными UPDATE"""
+        from .services.cache import page_cache, post_namespace
 
-        categories = self.categories.all()
-        for category in categories:
-            subscribers = category.subscribers.all()
-            for subscriber in subscribers:
-                self._send_single_notification(subscriber, category)
+        with transaction.atomic():
+            Post.objects.filter(pk=self.pk).update(rating=F('rating') + delta)
+            Author.apply_rating_delta(delta * Author.POST_RATING_WEIGHT, author_id=self.author_id)
+            transaction.on_commit(lambda: page_cache.bump(post_namespace(self.pk)))
+        self.rating += delta
 
-        # Помечаем, что уведомления отправлены
+    def send_notifications_to_subscribers(self):
+        """Ставит уведомления подписчикам категорий поста в очередь отправки (outbox).
+
+        Каждый подписчик получает одно письмо, даже если подписан
+        на несколько категорий поста: в письме перечислены все совпавшие.
+        """
+        from .services.outbox import OutboxService
+
+        with transaction.atomic():
+            # Атомарно помечаем пост, чтобы повторный вызов (сигнал + view) не продублировал рассылку
+            if not self.claim_notifications():
+                return 0
+
+            categories = {category.id: category for category in self.categories.all()}
+
+            # Все получатели поста одним запросом: user_id -> (имя, email, [id категорий])
+            recipients = {}
+            subscriptions = Subscription.objects.filter(
+                category_id__in=list(categories)
+            ).exclude(user__email='').values_list(
+                'user_id', 'user__username', 'user__email', 'category_id'
+            ).order_by('user_id', 'category_id')
+            for user_id, username, email, category_id in subscriptions:
+                recipients.setdefault(user_id, (username, email, []))[2].append(category_id)
+
+            # Письмо рендерится один раз на каждый встретившийся набор категорий
+            rendered_by_categories = {}
+            messages = []
+            for username, email, category_ids in recipients.values():
+                key = tuple(category_ids)
+                if key not in rendered_by_categories:
+                    rendered_by_categories[key] = self.render_notification([categories[pk] for pk in key])
+                messages.append(OutboxService.build(email, *rendered_by_categories[key].for_recipient(username)))
+
+            queued = OutboxService.enqueue(messages)
+
+        return queued
+
+    def claim_notifications(self):
+        """Помечает, что уведомления по посту отправлены; False, если это уже сделал кто-то другой"""
+        claimed = Post.objects.filter(pk=self.pk, notifications_sent=False).update(notifications_sent=True)
         self.notifications_sent = True
-        self.save()
-
-    def _send_single_notification(self, subscriber, category):
-        """Отправляет одно уведомление конкретному подписчику"""
-        try:
-            if self.post_type == self.NEWS:
-                subject = f'📰 Новая новость в категории "{category.name}"'
-                template = 'emails/new_post_notification.html'
-                text_template = 'emails/new_post_notification.txt'
-            else:
-                subject = f'📄 Новая статья в категории "{category.name}"'
-                template = 'emails/new_article_notification.html'
-                text_template = 'emails/new_article_notification.txt'
-
-            context = {
-                'username': subscriber.username,
-                'post_title': self.title,
-                'post_preview': self.preview(),
-                'category_name': category.name,
-                'post_url': f"{settings.SITE_URL}/news/{self.id}/",
-                'author_name': self.author.user.username,
-                'post_date': self.created_at.strftime('%d.%m.%Y в %H:%M'),
-                'unsubscribe_url': f"{settings.SITE_URL}/news/category/{category.id}/unsubscribe/",
-            }
-
-            # Текстовая версия
-            message = render_to_string(text_template, context)
-
-            # HTML версия
-            html_message = render_to_string(template, context)
-
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[subscriber.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            print(f"✅ Уведомление отправлено {subscriber.email}")
-
-        except Exception as e:
-            print(f"❌ Ошибка отправки уведомления для {subscriber.email}: {e}")
+        return bool(claimed)
+
+    def render_notification(self, categories):
+        """Рендерит уведомление о посте для набора категорий один раз для всех их подписчиков"""
+        from .services.rendering import EmailRenderer
+
+        names = ', '.join(f'"{category.name}"' for category in categories)
+        where = f'в категориях {names}' if len(categories) > 1 else f'в категории {names}'
+        if self.post_type == self.NEWS:
+            subject = f'📰 Новая новость {where}'
+            template = 'emails/new_post_notification.html'
+            text_template = 'emails/new_post_notification.txt'
+        else:
+            subject = f'📄 Новая статья {where}'
+            template = 'emails/new_article_notification.html'
+            text_template = 'emails/new_article_notification.txt'
+
+        context = {
+            'post_title': self.censored_title or self.title,
+            'post_preview': self.preview(),
+            'category_name': categories[0].name,
+            'categories': [
+                {
+                    'name': category.name,
+                    'unsubscribe_url': f"{settings.SITE_URL}/news/category/{category.id}/unsubscribe/",
+                }
+                for category in categories
+            ],
+            'post_url': f"{settings.SITE_URL}/news/{self.id}/",
+            'author_name': self.author.user.username,
+            'post_date': self.created_at.strftime('%d.%m.%Y в %H:%M'),
+            'unsubscribe_url': f"{settings.SITE_URL}/news/category/{categories[0].id}/unsubscribe/",
+        }
+
+        return EmailRenderer.render_shared(subject, text_template, template, context)
 
 
 class PostCategory(models.Model):
@@ -203,6 +332,10 @@ class PostCategory(models.Model):
 
     class Meta:
         verbose_name_plural = "Post Categories"
+        indexes = [
+            # Посты категории без обращения к таблице связей
+            models.Index(fields=['category', 'post'], name='postcategory_category_post_idx'),
+        ]
 
     def __str__(self):
         return f"{self.post.title} - {self.category.name}"
@@ -218,13 +351,41 @@ class Comment(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+    def save(self, *args, **kwargs):
+        update_fields = exclude_rating(self, kwargs)
+        if update_fields is None or not {'user', 'post'} & set(update_fields):
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            stored = Comment.objects.filter(pk=self.pk).values_list('user_id', 'post_id', 'rating').first()
+            super().save(*args, **kwargs)
+            if not stored or not stored[2]:
+                return
+            user_id, post_id, rating = stored
+            # Рейтинг комментария переходит к новому автору комментария и автору нового поста
+            if user_id != self.user_id:
+                Author.apply_rating_delta(-rating, user_id=user_id)
+                Author.apply_rating_delta(rating, user_id=self.user_id)
+            if post_id != self.post_id:
+                Author.apply_rating_delta(-rating, post_id=post_id)
+                Author.apply_rating_delta(rating, post_id=self.post_id)
+
     def like(self):
-        self.rating += 1
-        self.save()
+        from .services.votes import vote_buffer
+        vote_buffer.add(self, 1)
 
     def dislike(self):
-        self.rating -= 1
-        self.save()
+        from .services.votes import vote_buffer
+        vote_buffer.add(self, -1)
+
+    def vote(self, delta):
+        """Меняет рейтинг комментария, его автора и автора поста атомарными UPDATE"""
+        with transaction.atomic():
+            Comment.objects.filter(pk=self.pk).update(rating=F('rating') + delta)
+            Author.apply_rating_delta(delta, user_id=self.user_id)
+            Author.apply_rating_delta(delta, post_id=self.post_id)
+        self.rating += delta
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.post.title}"
@@ -251,4 +412,49 @@ class ActivationToken(models.Model):
 
     def __str__(self):
         status = 'Activated' if self.activated else 'Expired' if self.is_expired() else 'Pending'
-        return f"Token for {self.user.username} - {status}"
\ No newline at end of file
+        return f"Token for {self.user.username} - {status}"
+
+class EmailOutbox(models.Model):
+    """Очередь исходящих писем: публикация только пишет строки, отправляет фоновый воркер"""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUSES = [
+        (PENDING, 'Ожидает отправки'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (DEAD, 'Не доставлено'),
+    ]
+
+    # Транзакционные письма (регистрация, активация) отправляются раньше массовых
+    TRANSACTIONAL = 'transactional'
+    BULK = 'bulk'
+    LANES = [
+        (TRANSACTIONAL, 'Транзакционные'),
+        (BULK, 'Массовые'),
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    lane = models.CharField(max_length=13, choices=LANES, default=BULK)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=32, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+            models.Index(fields=['status', 'lane', 'next_attempt_at'], name='outbox_status_lane_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email}: {self.subject} [{self.status}]"
@@ -0,0 +1,164 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    """Курсор поврежден или не подходит к сортировке"""
+
+
+class CountedPaginator(Paginator):
+    """Paginator, которому можно передать готовое число объектов (count=) вместо COUNT(*)"""
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+class CursorPage:
+    """Страница keyset-пагинации: объекты и курсоры соседних страниц.
+
+    Хранит только готовый список объектов и строки курсоров, поэтому
+    страницу можно целиком положить в кэш.
+    """
+
+    def __init__(self, object_list, cursor=None, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по уникальной сортировке, по умолчанию (-created_at, -id).
+
+    Следующая страница выбирается условием WHERE (created_at, id) < (последняя
+    строка) ... LIMIT per_page + 1, поэтому стоимость страницы не зависит от
+    глубины: нет OFFSET и COUNT(*). Курсор - непрозрачный токен со значениями
+    ключа граничной строки и направлением.
+    Поля сортировки должны быть собственными полями модели, последнее - уникальным.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-created_at', '-pk'), count=None):
+        self.object_list = object_list
+        if count is not None:
+            self._count = count
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        model = object_list.model
+        self._fields = []
+        for name in self.ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            self._fields.append((name, field, descending))
+
+    @property
+    def count(self):
+        # COUNT(*) только по требованию шаблона; представление может подставить готовое значение
+        if not hasattr(self, '_count'):
+            self._count = self.object_list.count()
+        return self._count
+
+    @count.setter
+    def count(self, value):
+        self._count = value
+
+    def encode_cursor(self, obj, direction):
+        values = [getattr(obj, field.attname) for _, field, _ in self._fields]
+        # Полная точность времени: DjangoJSONEncoder отбрасывает микросекунды, и граничная строка повторилась бы
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != len(self._fields):
+                raise InvalidCursor(cursor)
+            values = [field.to_python(value) for (_, field, _), value in zip(self._fields, values)]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            raise InvalidCursor(cursor)
+        # Поля сортировки не допускают NULL: None в ключе нельзя сравнить в условии WHERE
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _seek(self, values, forward):
+        """Условие "строго после ключа" (forward) или "строго перед ключом" в порядке сортировки"""
+        condition = Q()
+        for index, (name, _, descending) in enumerate(self._fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            equal = {prefix: value for (prefix, _, _), value in zip(self._fields[:index], values)}
+            condition |= Q(**equal) & Q(**{f'{name}__{lookup}': values[index]})
+        # Избыточная граница по первому полю дает планировщику диапазон по индексу вместо OR
+        name, _, descending = self._fields[0]
+        bound = 'lte' if descending == forward else 'gte'
+        return Q(**{f'{name}__{bound}': values[0]}) & condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def page(self, cursor=None):
+        """Страница по курсору (None - первая); InvalidCursor для поврежденного курсора"""
+        per_page = self.per_page
+        if not cursor:
+            rows = list(self.object_list.order_by(*self.ordering)[:per_page + 1])
+            has_next, has_previous = len(rows) > per_page, False
+            rows = rows[:per_page]
+        else:
+            direction, values = self.decode_cursor(cursor)
+            if direction == 'n':
+                rows = list(self.object_list.filter(self._seek(values, True)).order_by(*self.ordering)[:per_page + 1])
+                has_next, has_previous = len(rows) > per_page, True
+                rows = rows[:per_page]
+            else:
+                rows = list(
+                    self.object_list.filter(self._seek(values, False)).order_by(*self._reversed_ordering())[:per_page + 1]
+                )
+                if not rows:
+                    # Все более новые строки удалены: показываем первую страницу
+                    return self.page()
+                has_next, has_previous = True, len(rows) > per_page
+                rows = rows[:per_page][::-1]
+
+        return CursorPage(
+            rows,
+            cursor=cursor or None,
+            next_cursor=self.encode_cursor(rows[-1], 'n') if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0], 'p') if has_previous and rows else None,
+        )
+
+    def get_page(self, cursor=None):
+        """Как page(), но поврежденный курсор дает первую страницу"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('news.cache')
+
+_MISSING = object()
+
+# Пространство имен списков постов (лента, главная, счетчики)
+POSTS_NAMESPACE = 'posts'
+
+
+class VersionedCache:
+    """Кэш с поколениями: ключ значения включает номера поколений его пространств имен.
+
+    Инвалидация - это увеличение номера поколения (bump): старые ключи
+    просто перестают запрашиваться и вытесняются по таймауту, поэтому
+    не нужно знать и перечислять все закэшированные ключи.
+    """
+
+    prefix = 'vc'
+
+    def __init__(self):
+        # Статистика попаданий - в памяти процесса: чтение из кэша не должно ничего записывать
+        self._stats = {'hits': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+
+    def _generation_key(self, namespace):
+        return f'{self.prefix}:gen:{namespace}'
+
+    @staticmethod
+    def _initial_generation():
+        # Если счетчик вытеснен из кэша, новое поколение не должно совпасть со старыми
+        return time.time_ns() // 1000
+
+    def generations(self, namespaces):
+        """Текущие номера поколений (один запрос к кэшу на все пространства)"""
+        keys = {namespace: self._generation_key(namespace) for namespace in namespaces}
+        found = cache.get_many(list(keys.values()))
+        result = {}
+        for namespace, key in keys.items():
+            if key in found:
+                result[namespace] = found[key]
+                continue
+            generation = self._initial_generation()
+            if not cache.add(key, generation, None):
+                generation = cache.get(key, generation)
+            result[namespace] = generation
+        return result
+
+    def bump(self, *namespaces):
+        """Инвалидирует все значения, зависящие от этих пространств имен"""
+        for namespace in namespaces:
+            key = self._generation_key(namespace)
+            # Не incr: в бэкендах без атомарного incr он перезаписывает ключ с таймаутом
+            # по умолчанию, и поколение истекло бы. Новое поколение из времени уникально и
+            # при параллельных bump: два писателя не получат одинаковый номер
+            generation = max(self._initial_generation(), cache.get(key, 0) + 1)
+            cache.set(key, generation, None)
+        logger.debug(f"🧹 Новое поколение кэша: {', '.join(namespaces)}")
+
+    def make_key(self, name, namespaces):
+        generations = self.generations(namespaces)
+        versions = ':'.join(f'{namespace}@{generations[namespace]}' for namespace in namespaces)
+        return f'{self.prefix}:{name}:{versions}'
+
+    def get(self, key, default=None):
+        """Значение по ключу из make_key (с учетом статистики попаданий)"""
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            self._record('misses')
+            return default
+        self._record('hits')
+        return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+        cache.set(key, value, timeout)
+
+    def get_or_set(self, name, namespaces, builder, timeout=None):
+        """Значение из кэша или результат builder(), сохраненный под текущими поколениями"""
+        key = self.make_key(name, namespaces)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = builder()
+            self.set(key, value, timeout)
+        return value
+
+    def _record(self, outcome):
+        with self._stats_lock:
+            self._stats[outcome] += 1
+
+    def stats(self):
+        """Попадания, промахи и доля попаданий в этом процессе"""
+        with self._stats_lock:
+            hits, misses = self._stats['hits'], self._stats['misses']
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'ratio': hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {'hits': 0, 'misses': 0}
+
+
+page_cache = VersionedCache()
+
+
+def post_namespace(post_id):
+    """Пространство имен одного поста (страница новости)"""
+    return f'post:{post_id}'
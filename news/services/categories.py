@@ -0,0 +1,75 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from news.services.cache import page_cache
+
+logger = logging.getLogger('news.categories')
+
+# Пространство имен сводки категорий в версионированном кэше
+CATEGORIES_NAMESPACE = 'categories'
+# Только имена категорий (меню): не меняются от подписок и новых постов
+CATEGORY_NAMES_NAMESPACE = 'category_names'
+
+
+class CategorySummaryService:
+    """Сводка категорий для меню и боковых панелей: имя, число постов и подписчиков.
+
+    Строится тремя запросами (категории и два GROUP BY вместо JOIN по всей
+    PostCategory) и хранится в версионированном кэше; сигналы PostCategory,
+    Subscription и Category сбрасывают ее после коммита.
+    """
+
+    @staticmethod
+    def _build():
+        from news.models import Category, PostCategory, Subscription
+
+        posts = dict(
+            PostCategory.objects.values_list('category_id').annotate(total=Count('id')).order_by()
+        )
+        subscribers = dict(
+            Subscription.objects.values_list('category_id').annotate(total=Count('id')).order_by()
+        )
+        categories = list(Category.objects.all())
+        for category in categories:
+            category.posts_count = posts.get(category.pk, 0)
+            category.subscribers_count = subscribers.get(category.pk, 0)
+        logger.debug(f"📂 Сводка категорий построена: {len(categories)}")
+        return categories
+
+    @staticmethod
+    def summary():
+        """Список категорий с posts_count и subscribers_count"""
+        return page_cache.get_or_set('category_summary', [CATEGORIES_NAMESPACE], CategorySummaryService._build)
+
+    @staticmethod
+    def invalidate():
+        page_cache.bump(CATEGORIES_NAMESPACE)
+
+    @staticmethod
+    def invalidate_names():
+        """Категория добавлена, переименована или удалена: меняются и меню, и сводка"""
+        page_cache.bump(CATEGORIES_NAMESPACE, CATEGORY_NAMES_NAMESPACE)
+
+    @staticmethod
+    def _subscriptions_key(user_id):
+        # Этот ключ уже сбрасывают сигналы подписок
+        return f"user_{user_id}_subscriptions"
+
+    @staticmethod
+    def subscribed_ids(user):
+        """id категорий, на которые подписан пользователь"""
+        from news.models import Subscription
+
+        key = CategorySummaryService._subscriptions_key(user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            ids = frozenset(Subscription.objects.filter(user=user).values_list('category_id', flat=True))
+            cache.set(key, ids, getattr(settings, 'PAGE_CACHE_TIMEOUT', 300))
+        return ids
+
+    @staticmethod
+    def forget_subscriptions(*user_ids):
+        cache.delete_many([CategorySummaryService._subscriptions_key(user_id) for user_id in user_ids])
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger('news.censor')
+
+# Список по умолчанию, если CENSOR_WORDS не задан в настройках
+DEFAULT_CENSOR_WORDS = [
+    'редиска', 'плохой',
+    'дурак',
+]
+
+_END = ''
+
+# Длина анонса поста (символов содержимого)
+PREVIEW_LENGTH = 124
+
+
+class CensorEngine:
+    """Цензор, собранный один раз в одно регулярное выражение по префиксному дереву слов.
+
+    Общие префиксы слов сливаются ("плох(?:ой|ая)"), поэтому в каждой позиции
+    текста проверяется не более одной ветки на символ: проход линеен по длине
+    текста и не зависит от числа слов. Поиск без учета регистра; из нескольких
+    слов с общим началом маскируется самое длинное.
+    """
+
+    def __init__(self, words):
+        self.words = sorted({word.lower() for word in words if word})
+        self.pattern = self._compile(self.words)
+        # Отпечаток списка слов: входит в ключи кэша, где текст цензурируется при отрисовке
+        self.fingerprint = hashlib.md5('\n'.join(self.words).encode(), usedforsecurity=False).hexdigest()[:12]
+
+    @staticmethod
+    def _compile(words):
+        if not words:
+            return None
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[_END] = {}
+        return re.compile(CensorEngine._node_pattern(trie), re.IGNORECASE)
+
+    @staticmethod
+    def _node_pattern(node):
+        optional = _END in node
+        leaves, branches = [], []
+        for char, child in sorted(node.items()):
+            if char == _END:
+                continue
+            if list(child) == [_END]:
+                leaves.append(re.escape(char))
+            else:
+                branches.append(re.escape(char) + CensorEngine._node_pattern(child))
+
+        if leaves:
+            branches.append(leaves[0] if len(leaves) == 1 else f"[{''.join(leaves)}]")
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        pattern = f"(?:{'|'.join(branches)})"
+        # Конец слова внутри ветки: более длинное продолжение пробуется первым
+        return pattern + '?' if optional else pattern
+
+    @staticmethod
+    def _mask(match):
+        text = match.group()
+        return text[0] + '*' * (len(text) - 1)
+
+    def censor(self, text):
+        """Заменяет все буквы нежелательных слов на '*', кроме первой"""
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(self._mask, text)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_censor_engine():
+    """Цензор процесса; собирается при первом обращении и после смены CENSOR_WORDS"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = CensorEngine(getattr(settings, 'CENSOR_WORDS', DEFAULT_CENSOR_WORDS))
+                logger.debug(f"🚫 Цензор собран: {len(_engine.words)} слов")
+    return _engine
+
+
+def reload_censor_engine():
+    """Пересобирает цензор (после изменения списка слов во время работы)"""
+    global _engine
+    _engine = None
+    return get_censor_engine()
+
+
+def censor_text(text):
+    return get_censor_engine().censor(text)
+
+
+def make_preview(content):
+    """Анонс поста: начало содержимого"""
+    return content[:PREVIEW_LENGTH] + '...' if len(content) > PREVIEW_LENGTH else content
+
+
+def backfill_post_texts(post_model, chunk_size=500):
+    """Пересчитывает censored_title/censored_preview у всех постов пачками по id.
+
+    Принимает модель, чтобы работать и из миграции (историческая модель).
+    Возвращает (проверено, id измененных постов).
+    """
+    engine = get_censor_engine()
+    checked, changed_ids, last_pk = 0, [], 0
+    while True:
+        posts = list(
+            post_model.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'title', 'content', 'censored_title', 'censored_preview')[:chunk_size]
+        )
+        if not posts:
+            break
+        last_pk = posts[-1].pk
+        checked += len(posts)
+
+        changed = []
+        for post in posts:
+            title = engine.censor(post.title)
+            preview = engine.censor(make_preview(post.content))
+            if (title, preview) != (post.censored_title, post.censored_preview):
+                post.censored_title, post.censored_preview = title, preview
+                changed.append(post)
+        if changed:
+            post_model.objects.bulk_update(changed, ['censored_title', 'censored_preview'])
+            changed_ids.extend(post.pk for post in changed)
+    return checked, changed_ids
+
+
+@receiver(setting_changed)
+def reset_censor_engine(setting, **kwargs):
+    global _engine
+    if setting == 'CENSOR_WORDS':
+        _engine = None
@@ -0,0 +1,110 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('news.counts')
+
+
+class CountService:
+    """Приблизительные счетчики для пагинаторов и плашек "всего новостей".
+
+    Значение считается COUNT(*) при первом обращении и хранится в кэше
+    COUNT_RECOUNT_INTERVAL секунд; между точными пересчетами сигналы постов,
+    категорий и подписок меняют его на ±1. Расхождения (массовые вставки,
+    смена типа поста) исправляются следующим пересчетом.
+    """
+
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'COUNT_RECOUNT_INTERVAL', 600)
+
+    @staticmethod
+    def _get(key, counter):
+        value = cache.get(key)
+        if value is None:
+            value = counter()
+            # add не затирает счетчик, уже измененный сигналом параллельно
+            if not cache.add(key, value, CountService.timeout()):
+                value = cache.get(key, value)
+            logger.debug(f"🔢 Пересчитан счетчик {key}: {value}")
+        return max(0, value)
+
+    @staticmethod
+    def _adjust(key, delta):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Счетчика нет: он будет посчитан по БД при следующем обращении
+            pass
+
+    # Ключи
+    @staticmethod
+    def _news_key():
+        return 'counts:news'
+
+    @staticmethod
+    def _categories_key():
+        return 'counts:categories'
+
+    @staticmethod
+    def _category_posts_key(category_id):
+        return f'counts:category_posts:{category_id}'
+
+    @staticmethod
+    def _category_subscribers_key(category_id):
+        return f'counts:category_subscribers:{category_id}'
+
+    # Чтение
+    @staticmethod
+    def news_total():
+        """Сколько всего новостей"""
+        from news.models import Post
+
+        return CountService._get(
+            CountService._news_key(), Post.objects.filter(post_type=Post.NEWS).count
+        )
+
+    @staticmethod
+    def categories_total():
+        from news.models import Category
+
+        return CountService._get(CountService._categories_key(), Category.objects.count)
+
+    @staticmethod
+    def category_posts(category_id):
+        """Сколько постов в категории"""
+        from news.models import PostCategory
+
+        return CountService._get(
+            CountService._category_posts_key(category_id),
+            PostCategory.objects.filter(category_id=category_id).count
+        )
+
+    @staticmethod
+    def category_subscribers(category_id):
+        from news.models import Subscription
+
+        return CountService._get(
+            CountService._category_subscribers_key(category_id),
+            Subscription.objects.filter(category_id=category_id).count
+        )
+
+    # Изменения из сигналов
+    @staticmethod
+    def news_changed(delta):
+        CountService._adjust(CountService._news_key(), delta)
+
+    @staticmethod
+    def categories_changed(delta):
+        CountService._adjust(CountService._categories_key(), delta)
+
+    @staticmethod
+    def category_posts_changed(category_ids, delta):
+        for category_id in category_ids:
+            CountService._adjust(CountService._category_posts_key(category_id), delta)
+
+    @staticmethod
+    def category_subscribers_changed(category_ids, delta):
+        for category_id in category_ids:
+            CountService._adjust(CountService._category_subscribers_key(category_id), delta)
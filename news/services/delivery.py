@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import queue
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from news.services.outbox import OutboxService
+from news.models import EmailOutbox
+from news.services.rate_limiter import get_bulk_rate_limiter, get_rate_limiter, is_throttling_error
+
+logger = logging.getLogger('news.delivery')
+
+
+class PooledConnection:
+    """Открытое соединение почтового бэкенда с лимитом писем до переподключения"""
+
+    def __init__(self, backend=None, max_messages=200):
+        self.backend = backend
+        self.max_messages = max_messages
+        self.connection = None
+        self.sent = 0
+
+    def send(self, message):
+        if self.connection is None or self.sent >= self.max_messages:
+            self.reset()
+            self.connection = get_connection(self.backend, fail_silently=False)
+            self.connection.open()
+        message.connection = self.connection
+        self.connection.send_messages([message])
+        self.sent += 1
+
+    def reset(self):
+        """Закрывает соединение; следующее письмо откроет новое"""
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception as e:
+                logger.debug(f"Ошибка при закрытии соединения: {e}")
+        self.connection = None
+        self.sent = 0
+
+
+class DeliveryEngine:
+    """Отправка писем через пул открытых соединений и пул потоков.
+
+    Каждый поток берет из пула свое соединение и отправляет им пачку
+    писем, поэтому TCP+TLS+AUTH выполняется один раз на max_messages
+    писем, а не на каждое письмо. Перед каждым письмом поток получает
+    токен у планировщика, поэтому скорость не превышает лимиты провайдера.
+    Массовые письма дополнительно ограничены своей долей бюджета.
+    """
+
+    def __init__(self, workers=None, batch_size=None, max_messages=None, backend=None,
+                 limiter=None, bulk_limiter=None):
+        self.workers = max(1, workers or getattr(settings, 'EMAIL_OUTBOX_WORKERS', 4))
+        self.batch_size = max(1, batch_size or getattr(settings, 'EMAIL_DELIVERY_BATCH_SIZE', 50))
+        max_messages = max_messages or getattr(settings, 'EMAIL_DELIVERY_MESSAGES_PER_CONNECTION', 200)
+        self.limiter = limiter or get_rate_limiter()
+        self.bulk_limiter = bulk_limiter or get_bulk_rate_limiter()
+        self.throttle_pause = getattr(settings, 'EMAIL_THROTTLE_PAUSE', 30)
+
+        self._connections = queue.Queue()
+        for _ in range(self.workers):
+            self._connections.put(PooledConnection(backend, max_messages))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def send(self, rows):
+        """Отправляет строки очереди; возвращает ошибки в порядке rows (None - доставлено)"""
+        batches = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+        errors = []
+        for batch_errors in self._executor.map(self._send_batch, batches):
+            errors.extend(batch_errors)
+        return errors
+
+    def _send_batch(self, batch):
+        pooled = self._connections.get()
+        try:
+            errors = []
+            for row in batch:
+                if row.lane == EmailOutbox.BULK:
+                    self.bulk_limiter.acquire()
+                self.limiter.acquire()
+                try:
+                    # Письма отправляются по одному через открытое соединение,
+                    # чтобы ошибка одного адреса не скрывала судьбу остальных в пачке
+                    pooled.send(OutboxService.to_message(row))
+                    errors.append(None)
+                except Exception as e:
+                    if is_throttling_error(e):
+                        logger.warning(f"🐢 Провайдер ограничил отправку, пауза {self.throttle_pause} сек: {e}")
+                        self.limiter.pause(self.throttle_pause)
+                    pooled.reset()
+                    errors.append(e)
+            return errors
+        finally:
+            self._connections.put(pooled)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while not self._connections.empty():
+            self._connections.get_nowait().reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
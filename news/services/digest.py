@@ -0,0 +1,121 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from news.models import Post, PostCategory, Subscription
+
+
+class DigestPlan:
+    """Результат планирования еженедельной рассылки"""
+
+    def __init__(self, week_start, week_end, week, categories, posts_by_category, subscriptions):
+        self.week_start = week_start
+        self.week_end = week_end
+        self.week = week                            # ключ недели в журнале DigestDelivery
+        self.categories = categories                # {category_id: Category}
+        self.posts_by_category = posts_by_category  # {category_id: [Post, ...]}
+        self.subscriptions = subscriptions          # QuerySet подписок, которым нужен дайджест
+
+    def iter_chunks(self, chunk_size):
+        """Потоковая выборка подписок пачками по первичному ключу.
+
+        Обход по pk устойчив к тому, что обработанные строки выпадают
+        из выборки (журнал и last_weekly_sent обновляются по ходу).
+        """
+        last_pk = 0
+        while True:
+            chunk = list(self.subscriptions.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1].pk
+
+    def counts(self):
+        """Число подписок к отправке по категориям и число различных получателей"""
+        due = self.subscriptions.order_by()
+        per_category = dict(due.values_list('category_id').annotate(total=Count('id')))
+        recipients = due.aggregate(total=Count('user_id', distinct=True))['total']
+        return per_category, recipients
+
+
+class DigestPlanner:
+    """Планировщик дайджеста: фиксированное число запросов независимо от числа подписок"""
+
+    @staticmethod
+    def week_key(now=None):
+        """Понедельник текущей недели - ключ журнала отправок"""
+        today = timezone.localdate(now or timezone.now())
+        return today - timedelta(days=today.weekday())
+
+    @staticmethod
+    def shard_ranges(shards):
+        """Диапазоны user_id [low, high) равной ширины для shards шардов.
+
+        Границы считаются одним запросом и передаются всем шардам запуска:
+        если каждый процесс считал бы их сам, подписка, созданная между
+        стартами процессов, сдвинула бы границы и шарды пересеклись бы.
+        Крайние диапазоны открыты (None), так что новые пользователи тоже
+        попадают ровно в один шард.
+        """
+        if shards <= 1:
+            return [(None, None)]
+        bounds = Subscription.objects.aggregate(low=Min('user_id'), high=Max('user_id'))
+        low = bounds['low'] or 0
+        span = (bounds['high'] or 0) - low + 1
+        cuts = [low + span * index // shards for index in range(1, shards)]
+        return list(zip([None] + cuts, cuts + [None]))
+
+    @staticmethod
+    def shard_queryset(shards, shard, bounds=None):
+        """Подписки шарда shard из shards; bounds - готовый диапазон (low, high) из shard_ranges"""
+        low, high = bounds if bounds is not None else DigestPlanner.shard_ranges(shards)[shard]
+        subscriptions = Subscription.objects.all()
+        if low is not None:
+            subscriptions = subscriptions.filter(user_id__gte=low)
+        if high is not None:
+            subscriptions = subscriptions.filter(user_id__lt=high)
+        return subscriptions
+
+    @staticmethod
+    def due_subscriptions(week_ago, subscriptions=None):
+        """Подписки, которым дайджест не отправлялся больше недели (или ни разу)"""
+        if subscriptions is None:
+            subscriptions = Subscription.objects.all()
+        return subscriptions.filter(
+            Q(last_weekly_sent__isnull=True) | Q(last_weekly_sent__lt=week_ago)
+        )
+
+    @staticmethod
+    def weekly_posts_by_category(week_ago):
+        """Статьи за неделю сразу для всех категорий одним запросом"""
+        links = PostCategory.objects.filter(
+            post__post_type=Post.ARTICLE,
+            post__created_at__gte=week_ago
+        ).select_related('category', 'post__author__user').defer('post__content').order_by('category_id', '-post__created_at')
+
+        categories = {}
+        posts_by_category = defaultdict(list)
+        for link in links:
+            categories[link.category_id] = link.category
+            posts_by_category[link.category_id].append(link.post)
+        return categories, dict(posts_by_category)
+
+    @classmethod
+    def build(cls, now=None, subscriptions=None, week=None):
+        """Строит план рассылки; subscriptions позволяет сузить выборку (например, до шарда)"""
+        now = now or timezone.now()
+        week_ago = now - timedelta(days=7)
+        week = week or cls.week_key(now)
+
+        categories, posts_by_category = cls.weekly_posts_by_category(week_ago)
+
+        # Уже записанные в журнал за эту неделю подписки пропускаются - это и делает запуск возобновляемым
+        due = cls.due_subscriptions(week_ago, subscriptions).filter(
+            category_id__in=list(categories)
+        ).exclude(
+            digest_deliveries__week=week
+        ).select_related('user').order_by('pk')
+
+        return DigestPlan(week_ago, now, week, categories, posts_by_category, due)
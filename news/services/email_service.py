@@ -1,10 +1,18 @@
-from django.core.mail import EmailMultiAlternatives, send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.db import transaction
 from datetime import timedelta
-from news.models import Post, Category, Subscription
+from news.models import Post, Category, Subscription, DigestDelivery, EmailOutbox
+from news.services.outbox import OutboxService
+from news.services.rendering import EmailRenderer
+from news.services.digest import DigestPlanner
+import logging
+
+logger = logging.getLogger('news.email')
+
+DIGEST_CHUNK_SIZE = 1000
 
 
 class EmailService:
@@ -16,21 +24,19 @@ class EmailService:
 
         context = {
             'user': user,
+            'username': user.username,
             'activation_url': activation_url,
-            'site_url': settings.SITE_URL
+            'site_url': settings.SITE_URL,
+            'support_email': settings.DEFAULT_FROM_EMAIL,
         }
 
         text_content = render_to_string('emails/welcome_email.txt', context)
         html_content = render_to_string('emails/welcome_email.html', context)
 
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[user.email]
-        )
-        email.attach_alternative(html_content, "text/html")
-        email.send()
+        # Транзакционная очередь: воркер отправит письмо раньше массовых рассылок
+        OutboxService.enqueue([
+            OutboxService.build(user.email, subject, text_content, html_content, lane=EmailOutbox.TRANSACTIONAL)
+        ])
 
     @staticmethod
     def send_activation_success_email(user):
@@ -39,20 +45,18 @@ class EmailService:
 
         context = {
             'user': user,
-            'site_url': settings.SITE_URL
+            'username': user.username,
+            'site_url': settings.SITE_URL,
+            'login_url': f"{settings.SITE_URL}/accounts/login/",
         }
 
         text_content = render_to_string('emails/activation_success.txt', context)
         html_content = render_to_string('emails/activation_success.html', context)
 
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[user.email]
-        )
-        email.attach_alternative(html_content, "text/html")
-        email.send()
+        # Транзакционная очередь: воркер отправит письмо раньше массовых рассылок
+        OutboxService.enqueue([
+            OutboxService.build(user.email, subject, text_content, html_content, lane=EmailOutbox.TRANSACTIONAL)
+        ])
 
     @staticmethod
     def send_new_post_notification(post):
@@ -61,64 +65,120 @@ class EmailService:
         post.send_notifications_to_subscribers()
 
     @staticmethod
-    def send_weekly_digest():
-        """Отправка еженедельных дайджестов всем подписчикам"""
-        week_ago = timezone.now() - timedelta(days=7)
+    def render_weekly_digest(category, new_posts, week_start, week_end):
+        """Рендерит дайджест категории один раз для всех подписчиков"""
+        subject = f'📊 Еженедельный дайджест: новые статьи в категории "{category.name}"'
 
-        # Получаем все активные подписки
-        subscriptions = Subscription.objects.select_related('user', 'category').all()
+        context = {
+            'category_name': category.name,
+            'new_posts': new_posts,
+            'site_url': settings.SITE_URL,
+            'week_start': week_start.strftime('%d.%m.%Y'),
+            'week_end': week_end.strftime('%d.%m.%Y'),
+            'unsubscribe_url': f"{settings.SITE_URL}/news/category/{category.id}/unsubscribe/",
+        }
+
+        return EmailRenderer.render_shared(
+            subject, 'emails/weekly_digest.txt', 'emails/weekly_digest.html', context
+        )
+
+    @staticmethod
+    def preview_weekly_digest(shards=1, shard=0, week=None, bounds=None):
+        """Полное планирование рассылки без отправки: объемы для оценки нагрузки"""
+        plan = DigestPlanner.build(subscriptions=DigestPlanner.shard_queryset(shards, shard, bounds), week=week)
+        per_category, recipients = plan.counts()
+
+        categories = []
+        total_bytes = 0
+        for category_id, subscriptions in sorted(per_category.items(), key=lambda item: -item[1]):
+            rendered = EmailService.render_weekly_digest(
+                plan.categories[category_id],
+                plan.posts_by_category[category_id],
+                plan.week_start,
+                plan.week_end
+            )
+            # Размер готового MIME-письма (с кодированием), а не только текста шаблона
+            sample = OutboxService.to_message(
+                OutboxService.build('subscriber@example.com', *rendered.for_recipient('subscriber'))
+            )
+            message_bytes = len(sample.message().as_bytes())
+            total_bytes += message_bytes * subscriptions
+
+            categories.append({
+                'name': plan.categories[category_id].name,
+                'articles': len(plan.posts_by_category[category_id]),
+                'subscriptions': subscriptions,
+                'message_bytes': message_bytes,
+            })
+
+        return {
+            'week': plan.week,
+            'subscriptions': sum(per_category.values()),
+            'recipients': recipients,
+            'categories': categories,
+            'bytes': total_bytes,
+        }
+
+    @staticmethod
+    def send_weekly_digest(shards=1, shard=0, chunk_size=DIGEST_CHUNK_SIZE, week=None, bounds=None):
+        """Постановка еженедельных дайджестов в очередь отправки.
+
+        Подписки обрабатываются пачками: письма, строки журнала DigestDelivery
+        и last_weekly_sent каждой пачки записываются в одной транзакции,
+        поэтому прерванный запуск можно просто перезапустить без дублей.
+        """
+        plan = DigestPlanner.build(
+            subscriptions=DigestPlanner.shard_queryset(shards, shard, bounds),
+            week=week
+        )
+
+        # Общая часть дайджеста рендерится один раз на категорию
+        rendered_by_category = {}
 
         sent_count = 0
         error_count = 0
 
-        for subscription in subscriptions:
-            if subscription.needs_weekly_digest():
+        for chunk in plan.iter_chunks(chunk_size):
+            messages = []
+            deliveries = []
+            processed = []
+
+            for subscription in chunk:
+                user = subscription.user
                 try:
-                    category = subscription.category
-                    user = subscription.user
-
-                    # Получаем новые статьи за неделю в этой категории
-                    new_posts = Post.objects.filter(
-                        categories=category,
-                        post_type=Post.ARTICLE,
-                        created_at__gte=week_ago
-                    ).order_by('-created_at')
-
-                    if new_posts.exists():
-                        subject = f'📊 Еженедельный дайджест: новые статьи в категории "{category.name}"'
-
-                        context = {
-                            'username': user.username,
-                            'category_name': category.name,
-                            'new_posts': new_posts,
-                            'site_url': settings.SITE_URL,
-                            'week_start': (timezone.now() - timedelta(days=7)).strftime('%d.%m.%Y'),
-                            'week_end': timezone.now().strftime('%d.%m.%Y'),
-                            'unsubscribe_url': f"{settings.SITE_URL}/news/category/{category.id}/unsubscribe/",
-                        }
-
-                        text_content = render_to_string('emails/weekly_digest.txt', context)
-                        html_content = render_to_string('emails/weekly_digest.html', context)
-
-                        send_mail(
-                            subject=subject,
-                            message=text_content,
-                            from_email=settings.DEFAULT_FROM_EMAIL,
-                            recipient_list=[user.email],
-                            html_message=html_content,
-                            fail_silently=False,
+                    category_id = subscription.category_id
+                    if category_id not in rendered_by_category:
+                        rendered_by_category[category_id] = EmailService.render_weekly_digest(
+                            plan.categories[category_id],
+                            plan.posts_by_category[category_id],
+                            plan.week_start,
+                            plan.week_end
                         )
 
-                        # Обновляем время последней рассылки
-                        subscription.last_weekly_sent = timezone.now()
-                        subscription.save()
+                    if user.email:
+                        messages.append(OutboxService.build(
+                            user.email,
+                            *rendered_by_category[category_id].for_recipient(user.username)
+                        ))
 
-                        sent_count += 1
-                        print(f"✅ Еженедельный дайджест отправлен {user.email}")
+                    subscription.last_weekly_sent = plan.week_end
+                    processed.append(subscription)
+                    deliveries.append(DigestDelivery(subscription=subscription, week=plan.week))
 
                 except Exception as e:
                     error_count += 1
-                    print(f"❌ Ошибка отправки дайджеста для {user.email}: {e}")
+                    logger.error(f"❌ Ошибка подготовки дайджеста для {user.email}: {e}")
+
+            with transaction.atomic():
+                OutboxService.enqueue(messages)
+                DigestDelivery.objects.bulk_create(deliveries)
+                Subscription.objects.bulk_update(processed, ['last_weekly_sent'])
+
+            sent_count += len(messages)
+            logger.info(
+                f"📊 Шард {shard + 1}/{shards}: пачка до подписки #{chunk[-1].pk}, "
+                f"в очередь добавлено {len(messages)} дайджестов"
+            )
 
         return {
             'sent': sent_count,
@@ -128,43 +188,9 @@ class EmailService:
 
     @staticmethod
     def send_immediate_article_notification(post):
-        """Отправка мгновенных уведомлений о новой статье подписчикам"""
+        """Постановка в очередь мгновенных уведомлений о новой статье подписчикам"""
         if post.post_type != Post.ARTICLE:
-            return
-
-        categories = post.categories.all()
-
-        for category in categories:
-            subscribers = category.subscribers.all()
-
-            for subscriber in subscribers:
-                if subscriber.email:
-                    try:
-                        subject = f'📄 Новая статья в категории "{category.name}"'
-
-                        context = {
-                            'username': subscriber.username,
-                            'post_title': post.title,
-                            'post_preview': post.preview(),
-                            'category_name': category.name,
-                            'post_url': f"{settings.SITE_URL}/news/{post.id}/",
-                            'author_name': post.author.user.username,
-                            'post_date': post.created_at.strftime('%d.%m.%Y в %H:%M'),
-                            'unsubscribe_url': f"{settings.SITE_URL}/news/category/{category.id}/unsubscribe/",
-                        }
-
-                        text_content = render_to_string('emails/new_article_notification.txt', context)
-                        html_content = render_to_string('emails/new_article_notification.html', context)
-
-                        send_mail(
-                            subject=subject,
-                            message=text_content,
-                            from_email=settings.DEFAULT_FROM_EMAIL,
-                            recipient_list=[subscriber.email],
-                            html_message=html_content,
-                            fail_silently=False,
-                        )
-                        print(f"✅ Уведомление о статье отправлено {subscriber.email}")
+            return 0
 
-                    except Exception as e:
-                        print(f"❌ Ошибка отправки уведомления о статье для {subscriber.email}: {e}")
\ No newline at end of file
+        # Одно письмо на подписчика со списком всех совпавших категорий
+        return post.send_notifications_to_subscribers()
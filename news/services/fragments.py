@@ -0,0 +1,57 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from news.services.cache import page_cache
+from news.services.censor import get_censor_engine
+
+logger = logging.getLogger('news.fragments')
+
+# Общее поколение всех фрагментов: увеличивается, когда меняется отрисовка без сохранения постов
+FRAGMENTS_NAMESPACE = 'fragments'
+
+
+class FragmentCache:
+    """Кэш отрисованных фрагментов поста (строка списка, текст новости).
+
+    Ключ включает id поста и updated_at: сохранение поста меняет ключ только
+    его фрагментов, старые вытесняются по таймауту. Отпечаток списка CENSOR_WORDS
+    в ключе обновляет фрагменты с фильтром |censor после смены списка, а
+    поколение - после backfill_post_previews (bulk_update не меняет updated_at).
+    Во фрагмент попадают лишь данные, которые меняются при сохранении (голоса
+    не меняют updated_at, поэтому рейтинг остается вне фрагмента).
+    """
+
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 86400)
+
+    @staticmethod
+    def generation():
+        return page_cache.generations([FRAGMENTS_NAMESPACE])[FRAGMENTS_NAMESPACE]
+
+    @staticmethod
+    def make_key(name, post, generation):
+        censor = get_censor_engine().fingerprint
+        return f'fragment:{name}:{generation}:{censor}:{post.pk}:{post.updated_at.timestamp():.6f}'
+
+    @staticmethod
+    def get_or_render(name, post, render, generation=None):
+        """HTML фрагмента из кэша или результат render(), сохраненный для этой версии поста"""
+        if post.pk is None or post.updated_at is None:
+            return render()
+        if generation is None:
+            generation = FragmentCache.generation()
+
+        key = FragmentCache.make_key(name, post, generation)
+        html = cache.get(key)
+        if html is None:
+            html = render()
+            cache.set(key, html, FragmentCache.timeout())
+        return html
+
+    @staticmethod
+    def invalidate_all():
+        """Сбрасывает фрагменты всех постов (например, после пересчета текстов цензуры)"""
+        page_cache.bump(FRAGMENTS_NAMESPACE)
@@ -0,0 +1,71 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('news.groups')
+
+# Атрибут пользователя с группами на время запроса (как _perm_cache у ModelBackend)
+_MEMO_ATTR = '_news_group_names'
+
+
+class GroupService:
+    """Имена групп пользователя для проверок "автор ли он".
+
+    Внутри запроса имена запоминаются на объекте пользователя (request.user один
+    на запрос), между запросами хранятся в кэше GROUP_CACHE_TIMEOUT секунд.
+    Изменение User.groups сбрасывает кэш через сигналы, так что страница
+    проверяет членство в группах не более чем одним запросом.
+    """
+
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'GROUP_CACHE_TIMEOUT', 60)
+
+    @staticmethod
+    def _key(user_id):
+        return f"user_{user_id}_groups"
+
+    @staticmethod
+    def group_names(user):
+        """frozenset имен групп пользователя; для анонимного - пустой"""
+        if user is None or not user.is_authenticated:
+            return frozenset()
+        names = getattr(user, _MEMO_ATTR, None)
+        if names is not None:
+            return names
+
+        prefetched = getattr(user, '_prefetched_objects_cache', {}).get('groups')
+        if prefetched is not None:
+            # Списки в админке уже загрузили группы через prefetch_related
+            names = frozenset(group.name for group in prefetched)
+        else:
+            key = GroupService._key(user.pk)
+            names = cache.get(key)
+            if names is None:
+                names = frozenset(user.groups.values_list('name', flat=True))
+                cache.set(key, names, GroupService.timeout())
+                logger.debug(f"👥 Группы пользователя {user.pk} загружены из БД: {sorted(names)}")
+        setattr(user, _MEMO_ATTR, names)
+        return names
+
+    @staticmethod
+    def in_group(user, group_name):
+        return group_name in GroupService.group_names(user)
+
+    @staticmethod
+    def is_author(user):
+        return GroupService.in_group(user, 'authors')
+
+    @staticmethod
+    def forget(*users):
+        """Сбрасывает группы пользователей (объекты User или их id)"""
+        user_ids = []
+        for user in users:
+            if hasattr(user, 'pk'):
+                if hasattr(user, _MEMO_ATTR):
+                    delattr(user, _MEMO_ATTR)
+                user_ids.append(user.pk)
+            else:
+                user_ids.append(user)
+        cache.delete_many([GroupService._key(user_id) for user_id in user_ids])
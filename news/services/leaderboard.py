@@ -0,0 +1,114 @@
+from bisect import bisect_left, insort
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from news.models import Author
+
+logger = logging.getLogger('news.leaderboard')
+
+
+class Leaderboard:
+    """Рейтинг авторов в памяти процесса: отсортированный список ключей (-рейтинг, id).
+
+    Место автора и граница топа находятся бинарным поиском. Источник истины -
+    Author.rating: структура загружается из БД и перечитывается раз в
+    LEADERBOARD_REFRESH_INTERVAL секунд, а изменения рейтинга в этом процессе
+    применяются к ней сразу. Изменения из других процессов (воркеры, команды)
+    видны с задержкой до LEADERBOARD_REFRESH_INTERVAL секунд.
+    """
+
+    def __init__(self, refresh_interval=None):
+        self._refresh_interval = refresh_interval
+        self._keys = []
+        self._ratings = {}
+        self._names = {}
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    @property
+    def refresh_interval(self):
+        if self._refresh_interval is not None:
+            return self._refresh_interval
+        return getattr(settings, 'LEADERBOARD_REFRESH_INTERVAL', 60)
+
+    def reload(self):
+        """Перечитывает рейтинги всех авторов одним запросом"""
+        rows = list(Author.objects.values_list('pk', 'rating', 'user__username'))
+        keys = sorted((-rating, pk) for pk, rating, _ in rows)
+        with self._lock:
+            self._keys = keys
+            self._ratings = {pk: rating for pk, rating, _ in rows}
+            self._names = {pk: username for pk, _, username in rows}
+            self._loaded_at = time.monotonic()
+        logger.debug(f"🏆 Рейтинг авторов загружен: {len(rows)}")
+
+    def invalidate(self):
+        """Следующее обращение перечитает рейтинг из БД"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_interval:
+            self.reload()
+
+    def apply_deltas(self, deltas):
+        """Применяет изменения рейтинга {author_id: delta}.
+
+        Позиция ищется бинарным поиском, но удаление и вставка в список сдвигают
+        элементы: O(n) на автора, что для тысяч авторов дешевле перечитывания из БД.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for author_id, delta in deltas.items():
+                if not delta:
+                    continue
+                if author_id not in self._ratings:
+                    # Новый автор появится при следующей загрузке
+                    self._loaded_at = None
+                    return
+                old = self._ratings[author_id]
+                index = bisect_left(self._keys, (-old, author_id))
+                del self._keys[index]
+                self._ratings[author_id] = old + delta
+                insort(self._keys, (-(old + delta), author_id))
+
+    def _entry(self, rank, author_id):
+        return {
+            'rank': rank,
+            'author_id': author_id,
+            'username': self._names[author_id],
+            'rating': self._ratings[author_id],
+        }
+
+    def _rank(self, rating):
+        # Одинаковый рейтинг - одинаковое место: позиция первого ключа с таким рейтингом
+        return bisect_left(self._keys, (-rating,)) + 1
+
+    def top(self, limit=10):
+        """Первые limit авторов"""
+        self._ensure_fresh()
+        with self._lock:
+            return [
+                self._entry(self._rank(-neg_rating), author_id)
+                for neg_rating, author_id in self._keys[:limit]
+            ]
+
+    def rank(self, author_id):
+        """Место автора или None, если автора нет"""
+        self._ensure_fresh()
+        with self._lock:
+            if author_id not in self._ratings:
+                return None
+            return self._entry(self._rank(self._ratings[author_id]), author_id)
+
+    def __len__(self):
+        self._ensure_fresh()
+        return len(self._keys)
+
+
+leaderboard = Leaderboard()
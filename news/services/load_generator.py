@@ -0,0 +1,119 @@
+import random
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.crypto import get_random_string
+
+from news.models import Author, Category, Comment, Post, PostCategory, Subscription
+from news.services.ratings import RatingService
+
+WORDS = (
+    'новости', 'город', 'спорт', 'политика', 'экономика', 'наука', 'технологии',
+    'культура', 'погода', 'рынок', 'событие', 'интервью', 'обзор', 'аналитика',
+)
+
+
+class LoadGenerator:
+    """Наполнение базы синтетическими данными через bulk_create (без сигналов и save())"""
+
+    def __init__(self, batch_size=1000, seed=None):
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        # Метка запуска делает имена уникальными при повторном наполнении той же базы
+        self.tag = get_random_string(6).lower()
+
+    def _text(self, words):
+        return ' '.join(self.random.choice(WORDS) for _ in range(words))
+
+    def _users(self, prefix, count):
+        users = [
+            User(
+                username=f'{prefix}_{self.tag}_{i}',
+                email=f'{prefix}_{self.tag}_{i}@example.com',
+                password='!',  # непригодный пароль: вход под такими пользователями невозможен
+            )
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        # bulk_create на SQLite не возвращает pk, поэтому перечитываем
+        return list(User.objects.filter(username__startswith=f'{prefix}_{self.tag}_').order_by('id'))
+
+    @transaction.atomic
+    def seed(self, authors=10, categories=10, posts=100, subscribers=1000,
+             subscriptions_per_user=1, comments=0, post_type=Post.ARTICLE):
+        """Создает авторов, категории, посты, подписчиков, подписки и комментарии"""
+        author_users = self._users('author', authors)
+        Author.objects.bulk_create([Author(user=user) for user in author_users], batch_size=self.batch_size)
+        author_objects = list(Author.objects.filter(user__in=author_users))
+
+        Category.objects.bulk_create(
+            [Category(name=f'Категория {self.tag} {i}') for i in range(categories)],
+            batch_size=self.batch_size
+        )
+        category_objects = list(Category.objects.filter(name__startswith=f'Категория {self.tag} '))
+
+        new_posts = [
+            Post(
+                author=self.random.choice(author_objects),
+                post_type=post_type,
+                title=f'{self._text(5).capitalize()} #{i}',
+                content=self._text(120),
+                rating=self.random.randint(-5, 20),
+                # Уведомления по сгенерированным постам не рассылаются
+                notifications_sent=True,
+            )
+            for i in range(posts)
+        ]
+        # bulk_create не вызывает save(): заголовок и анонс после цензуры считаются здесь
+        for post in new_posts:
+            post.update_censored_fields()
+        Post.objects.bulk_create(new_posts, batch_size=self.batch_size)
+        post_ids = list(Post.objects.filter(author__in=author_objects).values_list('id', flat=True))
+
+        PostCategory.objects.bulk_create(
+            [
+                PostCategory(post_id=post_id, category=self.random.choice(category_objects))
+                for post_id in post_ids
+            ],
+            batch_size=self.batch_size
+        )
+
+        subscriber_users = self._users('reader', subscribers)
+        per_user = min(subscriptions_per_user, len(category_objects))
+        Subscription.objects.bulk_create(
+            [
+                Subscription(user=user, category=category)
+                for user in subscriber_users
+                for category in self.random.sample(category_objects, per_user)
+            ],
+            batch_size=self.batch_size
+        )
+
+        # Без подписчиков комментарии пишут сами авторы
+        commenters = subscriber_users or author_users
+        if comments and post_ids and commenters:
+            Comment.objects.bulk_create(
+                [
+                    Comment(
+                        post_id=self.random.choice(post_ids),
+                        user=self.random.choice(commenters),
+                        text=self._text(15),
+                        rating=self.random.randint(-3, 10),
+                    )
+                    for _ in range(comments)
+                ],
+                batch_size=self.batch_size
+            )
+
+        # bulk_create обходит приращения рейтинга: Author.rating считается по созданным данным
+        RatingService.recompute(author_ids=[author.pk for author in author_objects])
+        author_objects = list(Author.objects.filter(user__in=author_users))
+
+        return {
+            'authors': author_objects,
+            'categories': category_objects,
+            'posts': len(post_ids),
+            'subscribers': len(subscriber_users),
+            'subscriptions': len(subscriber_users) * per_user,
+            'comments': comments if post_ids and commenters else 0,
+        }
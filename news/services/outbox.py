@@ -0,0 +1,172 @@
+from datetime import timedelta
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import Count
+from django.utils import timezone
+
+from news.models import EmailOutbox
+
+logger = logging.getLogger('news.outbox')
+
+
+class OutboxService:
+    """Запись писем в очередь (outbox) и управление их состояниями"""
+
+    @staticmethod
+    def build(to_email, subject, body, html_body='', lane=EmailOutbox.BULK):
+        """Создает (не сохраняя) строку очереди для одного письма"""
+        return EmailOutbox(
+            to_email=to_email,
+            subject=subject,
+            body=body,
+            html_body=html_body or '',
+            lane=lane,
+        )
+
+    @staticmethod
+    def enqueue(messages):
+        """Массово добавляет письма в очередь, возвращает их количество"""
+        messages = list(messages)
+        if not messages:
+            return 0
+        batch_size = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 500)
+        EmailOutbox.objects.bulk_create(messages, batch_size=batch_size)
+        logger.info(f"📥 В очередь добавлено писем: {len(messages)}")
+        return len(messages)
+
+    @staticmethod
+    def release_stale():
+        """Возвращает в очередь письма, зависшие у упавшего воркера"""
+        timeout = getattr(settings, 'EMAIL_OUTBOX_LOCK_TIMEOUT', 600)
+        return EmailOutbox.objects.filter(
+            status=EmailOutbox.SENDING,
+            locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+        ).update(status=EmailOutbox.PENDING, locked_by='', locked_at=None)
+
+    @staticmethod
+    def claim_batch(limit, bulk_limit=None):
+        """Захватывает пачку готовых к отправке писем для текущего воркера.
+
+        Сначала берутся транзакционные письма, остаток пачки (не более
+        bulk_limit) добирается массовыми.
+        """
+        now = timezone.now()
+        ready = EmailOutbox.objects.filter(status=EmailOutbox.PENDING, next_attempt_at__lte=now).order_by('id')
+        candidate_ids = list(
+            ready.filter(lane=EmailOutbox.TRANSACTIONAL).values_list('id', flat=True)[:limit]
+        )
+        remaining = limit - len(candidate_ids)
+        if bulk_limit is not None:
+            remaining = min(remaining, bulk_limit)
+        if remaining > 0:
+            candidate_ids += list(ready.filter(lane=EmailOutbox.BULK).values_list('id', flat=True)[:remaining])
+        if not candidate_ids:
+            return []
+
+        token = uuid.uuid4().hex
+        # Условие по статусу гарантирует, что параллельный воркер не получит те же строки
+        EmailOutbox.objects.filter(
+            pk__in=candidate_ids,
+            status=EmailOutbox.PENDING
+        ).update(status=EmailOutbox.SENDING, locked_by=token, locked_at=now)
+
+        # Транзакционные письма идут в начале пачки и отправляются первыми
+        return sorted(
+            EmailOutbox.objects.filter(locked_by=token, status=EmailOutbox.SENDING),
+            key=lambda row: (row.lane != EmailOutbox.TRANSACTIONAL, row.pk)
+        )
+
+    @staticmethod
+    def to_message(row, connection=None):
+        """Собирает письмо Django из строки очереди"""
+        email = EmailMultiAlternatives(
+            subject=row.subject,
+            body=row.body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[row.to_email],
+            connection=connection,
+        )
+        if row.html_body:
+            email.attach_alternative(row.html_body, "text/html")
+        return email
+
+    @staticmethod
+    def mark_sent(ids):
+        """Помечает письма как отправленные"""
+        if not ids:
+            return 0
+        return EmailOutbox.objects.filter(pk__in=ids).update(
+            status=EmailOutbox.SENT,
+            sent_at=timezone.now(),
+            locked_by='',
+            locked_at=None,
+            last_error=''
+        )
+
+    @staticmethod
+    def mark_failed(row, error):
+        """Планирует повтор с экспоненциальной задержкой или переводит письмо в dead-letter"""
+        max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+        backoff = getattr(settings, 'EMAIL_OUTBOX_RETRY_BACKOFF', 60)
+        max_backoff = getattr(settings, 'EMAIL_OUTBOX_MAX_BACKOFF', 3600)
+
+        row.attempts += 1
+        row.last_error = str(error)[:1000]
+        row.locked_by = ''
+        row.locked_at = None
+
+        if row.attempts >= max_attempts:
+            row.status = EmailOutbox.DEAD
+            logger.error(f"💀 Письмо {row.pk} для {row.to_email} перемещено в dead-letter: {error}")
+        else:
+            delay = min(backoff * 2 ** (row.attempts - 1), max_backoff)
+            row.status = EmailOutbox.PENDING
+            row.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning(
+                f"🔁 Ошибка отправки письма {row.pk} для {row.to_email} "
+                f"(попытка {row.attempts}/{max_attempts}), повтор через {delay} сек: {error}"
+            )
+
+        row.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at', 'locked_by', 'locked_at'])
+
+    @staticmethod
+    def mark_throttled(ids, delay):
+        """Откладывает письма, отклоненные из-за лимитов провайдера, не расходуя попытки"""
+        if not ids:
+            return 0
+        return EmailOutbox.objects.filter(pk__in=ids).update(
+            status=EmailOutbox.PENDING,
+            next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            locked_by='',
+            locked_at=None
+        )
+
+    @staticmethod
+    def requeue(queryset):
+        """Возвращает письма (например, из dead-letter) в очередь"""
+        return queryset.exclude(status=EmailOutbox.SENT).update(
+            status=EmailOutbox.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            locked_by='',
+            locked_at=None
+        )
+
+    @staticmethod
+    def stats():
+        """Количество писем в очереди по статусам"""
+        counts = {status: 0 for status, _ in EmailOutbox.STATUSES}
+        for row in EmailOutbox.objects.order_by().values('status').annotate(total=Count('id')):
+            counts[row['status']] = row['total']
+        return counts
+
+    @staticmethod
+    def queue_depth(lane=None):
+        """Сколько писем еще предстоит отправить (ожидают или отправляются)"""
+        queryset = EmailOutbox.objects.filter(status__in=[EmailOutbox.PENDING, EmailOutbox.SENDING])
+        if lane is not None:
+            queryset = queryset.filter(lane=lane)
+        return queryset.count()
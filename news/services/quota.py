@@ -0,0 +1,98 @@
+from datetime import datetime, time, timedelta
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger('news.quota')
+
+
+class NewsQuotaService:
+    """Дневной лимит новостей автора: один счетчик в кэше на (автор, день).
+
+    Счетчик создается подсчетом в БД при первом обращении за день (сверка
+    при смене суток), затем только увеличивается при публикации. В рамках
+    запроса значение запоминается на объекте автора, поэтому миксин, форма
+    и контекст страницы обходятся одним обращением к кэшу. Post.clean
+    читает тот же счетчик, так что COUNT выполняется только при промахе.
+    Процессы видят общий счетчик при кэше в Redis (REDIS_URL), поэтому
+    несколько воркеров без него не запускают (см. CACHES в settings).
+    """
+
+    @staticmethod
+    def limit():
+        return getattr(settings, 'NEWS_DAILY_LIMIT', 3)
+
+    @staticmethod
+    def _day_bounds(day):
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return start, start + timedelta(days=1)
+
+    @staticmethod
+    def _key(author_id, day):
+        return f"news_quota:{author_id}:{day.isoformat()}"
+
+    @staticmethod
+    def _count_from_db(author_id, day):
+        from news.models import Post
+
+        start, end = NewsQuotaService._day_bounds(day)
+        return Post.objects.filter(
+            author_id=author_id,
+            post_type=Post.NEWS,
+            created_at__gte=start,
+            created_at__lt=end
+        ).count()
+
+    @staticmethod
+    def used(author):
+        """Сколько новостей автор опубликовал сегодня"""
+        day = timezone.localdate()
+        memo = getattr(author, '_news_quota', None)
+        if memo is not None and memo[0] == day:
+            return memo[1]
+
+        key = NewsQuotaService._key(author.pk, day)
+        count = cache.get(key)
+        if count is None:
+            count = NewsQuotaService._count_from_db(author.pk, day)
+            # Ключ живет до конца суток; add не затирает счетчик, увеличенный параллельно
+            _, end = NewsQuotaService._day_bounds(day)
+            timeout = int((end - timezone.now()).total_seconds()) + 3600
+            if not cache.add(key, count, timeout):
+                count = cache.get(key, count)
+
+        author._news_quota = (day, count)
+        return count
+
+    @staticmethod
+    def remaining(author):
+        return max(0, NewsQuotaService.limit() - NewsQuotaService.used(author))
+
+    @staticmethod
+    def can_publish(author):
+        return NewsQuotaService.used(author) < NewsQuotaService.limit()
+
+    @staticmethod
+    def _adjust(author_id, created_at, delta, author=None):
+        day = timezone.localtime(created_at).date()
+        try:
+            count = cache.incr(NewsQuotaService._key(author_id, day), delta)
+        except ValueError:
+            # Счетчика нет: он будет посчитан по БД при следующем обращении
+            count = None
+
+        memo = getattr(author, '_news_quota', None)
+        if memo is not None and memo[0] == day:
+            author._news_quota = (day, count if count is not None else memo[1] + delta)
+
+    @staticmethod
+    def record_published(post):
+        """Учитывает опубликованную новость"""
+        NewsQuotaService._adjust(post.author_id, post.created_at, 1, author=post.author)
+
+    @staticmethod
+    def record_deleted(post):
+        """Возвращает квоту за удаленную новость"""
+        NewsQuotaService._adjust(post.author_id, post.created_at, -1)
@@ -0,0 +1,153 @@
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+}
+
+# Коды SMTP, которыми провайдеры сообщают о превышении лимитов
+THROTTLE_CODES = {421, 450, 451, 452}
+
+
+class TokenBucket:
+    """Бакет на limit писем за period секунд с непрерывным пополнением"""
+
+    def __init__(self, limit, period):
+        self.capacity = float(limit)
+        self.rate = limit / period  # токенов в секунду
+        self.tokens = float(limit)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now, tokens=1):
+        """Через сколько секунд в бакете будет tokens токенов"""
+        self.refill(now)
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def consume(self, tokens=1):
+        self.tokens -= tokens
+
+
+class RateLimiter:
+    """Планировщик отправки по нескольким бюджетам (в секунду, минуту, час).
+
+    Письмо можно отправить, только когда токен есть во всех бакетах сразу,
+    поэтому массовые рассылки сглаживаются до самого строгого лимита.
+    """
+
+    def __init__(self, limits=None):
+        limits = limits or {}
+        self.limits = {period: limit for period, limit in limits.items() if limit}
+        self.buckets = [TokenBucket(limit, PERIODS[period]) for period, limit in self.limits.items()]
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(getattr(settings, 'EMAIL_RATE_LIMITS', None))
+
+    def scaled(self, share):
+        """Отдельный планировщик на долю share от каждого бюджета"""
+        return RateLimiter({period: max(1, int(limit * share)) for period, limit in self.limits.items()})
+
+    def _wait_time(self, now, tokens):
+        wait = max(0.0, self.paused_until - now)
+        for bucket in self.buckets:
+            wait = max(wait, bucket.wait_time(now, tokens))
+        return wait
+
+    def try_acquire(self, tokens=1):
+        """Забирает токены, если они есть; иначе возвращает время ожидания"""
+        with self._lock:
+            wait = self._wait_time(time.monotonic(), tokens)
+            if wait <= 0:
+                for bucket in self.buckets:
+                    bucket.consume(tokens)
+            return wait
+
+    def acquire(self, tokens=1, timeout=None):
+        """Ждет, пока отправка станет разрешена; False, если не дождались за timeout секунд"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def pause(self, seconds):
+        """Приостанавливает отправку (провайдер ответил, что мы превысили лимит)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def rate(self):
+        """Устойчивая скорость отправки, писем/сек (None - без ограничений)"""
+        if not self.buckets:
+            return None
+        return min(bucket.rate for bucket in self.buckets)
+
+    def estimate_drain_time(self, queue_depth):
+        """Оценка (сек), за сколько будет отправлено queue_depth писем с учетом текущих токенов"""
+        if not self.buckets or queue_depth <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            estimate = 0.0
+            for bucket in self.buckets:
+                bucket.refill(now)
+                estimate = max(estimate, max(0.0, queue_depth - bucket.tokens) / bucket.rate)
+            return estimate + max(0.0, self.paused_until - now)
+
+
+def is_throttling_error(error):
+    """Отличает ответы провайдера о превышении лимита от прочих ошибок отправки"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code in THROTTLE_CODES for code, _ in error.recipients.values())
+    code = getattr(error, 'smtp_code', None)
+    return code in THROTTLE_CODES
+
+
+_limiter = None
+_bulk_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Общий на процесс планировщик: все пути отправки расходуют один бюджет"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter.from_settings()
+    return _limiter
+
+
+def get_bulk_rate_limiter():
+    """Дополнительный бюджет массовых писем: остаток общего гарантирован транзакционным"""
+    global _bulk_limiter
+    if _bulk_limiter is None:
+        with _limiter_lock:
+            if _bulk_limiter is None:
+                _bulk_limiter = RateLimiter.from_settings().scaled(getattr(settings, 'EMAIL_BULK_RATE_SHARE', 0.8))
+    return _bulk_limiter
+
+
+@receiver(setting_changed)
+def reset_rate_limiter(setting, **kwargs):
+    global _limiter, _bulk_limiter
+    if setting in ('EMAIL_RATE_LIMITS', 'EMAIL_BULK_RATE_SHARE'):
+        _limiter = None
+        _bulk_limiter = None
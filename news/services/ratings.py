@@ -0,0 +1,108 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Sum
+
+from news.models import Author, Comment, Post
+from news.services.leaderboard import leaderboard
+
+logger = logging.getLogger('news.ratings')
+
+RATING_CHUNK_SIZE = 500
+
+
+class RatingService:
+    """Массовый пересчет рейтингов авторов сгруппированными агрегатами"""
+
+    @staticmethod
+    def compute_ratings(authors):
+        """Рейтинги для пачки авторов: три GROUP BY запроса на всю пачку.
+
+        authors - список (author_id, user_id); возвращает {author_id: рейтинг}.
+        """
+        author_ids = [author_id for author_id, _ in authors]
+        user_to_author = {user_id: author_id for author_id, user_id in authors}
+
+        ratings = dict.fromkeys(author_ids, 0)
+
+        post_totals = (
+            Post.objects.filter(author_id__in=author_ids)
+            .order_by().values('author_id').annotate(total=Sum('rating'))
+        )
+        for row in post_totals:
+            ratings[row['author_id']] += (row['total'] or 0) * Author.POST_RATING_WEIGHT
+
+        own_comment_totals = (
+            Comment.objects.filter(user_id__in=user_to_author)
+            .order_by().values('user_id').annotate(total=Sum('rating'))
+        )
+        for row in own_comment_totals:
+            ratings[user_to_author[row['user_id']]] += row['total'] or 0
+
+        received_comment_totals = (
+            Comment.objects.filter(post__author_id__in=author_ids)
+            .order_by().values('post__author_id').annotate(total=Sum('rating'))
+        )
+        for row in received_comment_totals:
+            ratings[row['post__author_id']] += row['total'] or 0
+
+        return ratings
+
+    @staticmethod
+    def iter_author_chunks(author_ids=None, chunk_size=RATING_CHUNK_SIZE):
+        """Авторы пачками по pk: [(author_id, user_id, сохраненный рейтинг), ...]"""
+        queryset = Author.objects.order_by('pk')
+        if author_ids:
+            queryset = queryset.filter(pk__in=author_ids)
+
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk).values_list('pk', 'user_id', 'rating')[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1][0]
+
+    @staticmethod
+    def find_drift(author_ids=None, chunk_size=RATING_CHUNK_SIZE):
+        """Сверка без записи: (проверено авторов, [(author_id, сохранено, пересчитано), ...])"""
+        checked = 0
+        drift = []
+        for chunk in RatingService.iter_author_chunks(author_ids, chunk_size):
+            ratings = RatingService.compute_ratings([(pk, user_id) for pk, user_id, _ in chunk])
+            drift.extend(
+                (pk, stored, ratings[pk]) for pk, _, stored in chunk if stored != ratings[pk]
+            )
+            checked += len(chunk)
+        return checked, drift
+
+    @staticmethod
+    def recompute(author_ids=None, chunk_size=RATING_CHUNK_SIZE):
+        """Пересчитывает рейтинги и записывает изменившиеся пачками через bulk_update.
+
+        Строки авторов пачки блокируются до подсчета: голос (Post.vote, Comment.vote)
+        меняет пост и автора в одной транзакции, поэтому он либо уже учтен в агрегатах
+        и перезаписывается верным значением, либо ждет блокировки и добавляет свое
+        приращение F() к записанному рейтингу.
+        """
+        processed = 0
+        updated = 0
+        for chunk in RatingService.iter_author_chunks(author_ids, chunk_size):
+            with transaction.atomic():
+                locked = list(
+                    Author.objects.select_for_update()
+                    .filter(pk__in=[pk for pk, _, _ in chunk]).order_by('pk')
+                    .values_list('pk', 'user_id', 'rating')
+                )
+                ratings = RatingService.compute_ratings([(pk, user_id) for pk, user_id, _ in locked])
+                changed = [
+                    Author(pk=pk, rating=ratings[pk]) for pk, _, stored in locked if stored != ratings[pk]
+                ]
+                Author.objects.bulk_update(changed, ['rating'], batch_size=chunk_size)
+            processed += len(chunk)
+            updated += len(changed)
+
+        if updated:
+            leaderboard.invalidate()
+        logger.info(f"⭐ Рейтинги пересчитаны: авторов {processed}, изменено {updated}")
+        return {'processed': processed, 'updated': updated}
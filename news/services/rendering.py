@@ -0,0 +1,64 @@
+from django.template.loader import get_template
+from django.utils.html import conditional_escape
+import threading
+
+# Маркер, который подставляется вместо имени получателя при общем рендеринге.
+# Не содержит символов, которые экранирует автоэкранирование Django.
+USERNAME_PLACEHOLDER = '%%NP_RECIPIENT_USERNAME%%'
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_cached_template(name):
+    """Компилирует шаблон один раз на процесс, независимо от DEBUG и настроек загрузчиков"""
+    template = _templates.get(name)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(name)
+            if template is None:
+                template = get_template(name)
+                _templates[name] = template
+    return template
+
+
+def clear_template_cache():
+    """Сбрасывает кэш скомпилированных шаблонов (после изменения шаблонов на диске)"""
+    with _templates_lock:
+        _templates.clear()
+
+
+class RenderedEmail:
+    """Письмо, отрендеренное один раз для всех получателей.
+
+    Персональные поля подставляются склейкой заранее разрезанных частей,
+    без повторного прохода шаблонизатора.
+    """
+
+    def __init__(self, subject, text, html):
+        self.subject = subject
+        self._text_parts = text.split(USERNAME_PLACEHOLDER)
+        self._html_parts = html.split(USERNAME_PLACEHOLDER)
+
+    def for_recipient(self, username):
+        """Возвращает (тема, текст, html) для конкретного получателя"""
+        # Оба шаблона рендерятся с автоэкранированием, поэтому и подстановка экранируется,
+        # чтобы результат совпадал с отдельным рендерингом для каждого получателя
+        username = str(conditional_escape(username))
+        return (
+            self.subject,
+            username.join(self._text_parts),
+            username.join(self._html_parts),
+        )
+
+
+class EmailRenderer:
+    """Рендеринг писем: общая часть один раз на (пост, категория) или (категория, неделя)"""
+
+    @staticmethod
+    def render_shared(subject, text_template, html_template, context):
+        """Рендерит оба шаблона с маркером вместо имени получателя"""
+        context = dict(context, username=USERNAME_PLACEHOLDER)
+        text = get_cached_template(text_template).render(context)
+        html = get_cached_template(html_template).render(context)
+        return RenderedEmail(subject, text, html)
@@ -0,0 +1,150 @@
+from collections import defaultdict
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from news.models import Author, Comment, Post
+from news.services.cache import page_cache, post_namespace
+from news.services.leaderboard import leaderboard
+
+logger = logging.getLogger('news.votes')
+
+
+class VoteBuffer:
+    """Буфер голосов процесса: приращения копятся в памяти и периодически
+    записываются одним UPDATE ... SET rating = rating + delta на объект.
+
+    Сотни лайков популярного поста между сбросами превращаются в одну запись
+    в строку поста и одну в строку его автора.
+    """
+
+    def __init__(self, interval=None):
+        self._interval = interval
+        self._posts = defaultdict(int)
+        self._comments = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+
+    @property
+    def interval(self):
+        if self._interval is not None:
+            return self._interval
+        return getattr(settings, 'VOTE_FLUSH_INTERVAL', 5)
+
+    def add(self, obj, delta):
+        """Принимает голос за пост или комментарий.
+
+        obj.rating не меняется до сброса: иначе сохраненная копия объекта
+        записала бы голос в БД второй раз, вместе с самим сбросом.
+        """
+        if self.interval <= 0:
+            # Буфер отключен: голос сразу записывается в БД
+            obj.vote(delta)
+            return
+
+        target = self._posts if isinstance(obj, Post) else self._comments
+        with self._lock:
+            target[obj.pk] += delta
+        self._ensure_started()
+
+    def pending(self):
+        """Сколько объектов ждут записи"""
+        with self._lock:
+            return len(self._posts) + len(self._comments)
+
+    def flush(self):
+        """Записывает накопленные голоса; возвращает число обновленных объектов"""
+        with self._lock:
+            posts, self._posts = self._posts, defaultdict(int)
+            comments, self._comments = self._comments, defaultdict(int)
+
+        posts = {pk: delta for pk, delta in posts.items() if delta}
+        comments = {pk: delta for pk, delta in comments.items() if delta}
+        if not posts and not comments:
+            return 0
+
+        try:
+            return self._apply(posts, comments)
+        except Exception as e:
+            # Голоса не теряются: возвращаем их в буфер до следующего сброса
+            with self._lock:
+                for pk, delta in posts.items():
+                    self._posts[pk] += delta
+                for pk, delta in comments.items():
+                    self._comments[pk] += delta
+            logger.error(f"❌ Ошибка записи голосов, повтор при следующем сбросе: {e}")
+            return 0
+
+    @staticmethod
+    def _apply(posts, comments):
+        author_deltas = defaultdict(int)
+
+        for post_id, author_id in Post.objects.filter(pk__in=posts).values_list('pk', 'author_id'):
+            author_deltas[author_id] += posts[post_id] * Author.POST_RATING_WEIGHT
+
+        if comments:
+            rows = list(Comment.objects.filter(pk__in=comments).values_list('pk', 'user_id', 'post__author_id'))
+            user_authors = dict(
+                Author.objects.filter(user_id__in={user_id for _, user_id, _ in rows}).values_list('user_id', 'pk')
+            )
+            for comment_id, user_id, post_author_id in rows:
+                author_deltas[post_author_id] += comments[comment_id]
+                if user_id in user_authors:
+                    author_deltas[user_authors[user_id]] += comments[comment_id]
+
+        with transaction.atomic():
+            for pk, delta in posts.items():
+                Post.objects.filter(pk=pk).update(rating=F('rating') + delta)
+            for pk, delta in comments.items():
+                Comment.objects.filter(pk=pk).update(rating=F('rating') + delta)
+            for pk, delta in author_deltas.items():
+                if delta:
+                    Author.objects.filter(pk=pk).update(rating=F('rating') + delta)
+            transaction.on_commit(lambda: leaderboard.apply_deltas(author_deltas))
+            if posts:
+                # Рейтинг виден на странице поста
+                transaction.on_commit(lambda: page_cache.bump(*[post_namespace(pk) for pk in posts]))
+
+        updated = len(posts) + len(comments) + len(author_deltas)
+        logger.debug(f"👍 Записаны голоса: постов {len(posts)}, комментариев {len(comments)}")
+        return updated
+
+    def _ensure_started(self):
+        # После fork (предзагрузка приложения в gunicorn) поток родителя в дочернем процессе не существует
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='vote-buffer-flush', daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+    def stop(self):
+        """Останавливает фоновый сброс и записывает оставшиеся голоса"""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+
+vote_buffer = VoteBuffer()
@@ -1,4 +1,4 @@
-from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group
 from django.db import transaction
@@ -8,8 +8,13 @@ from django.utils import timezone
 from allauth.account.signals import user_signed_up
 from allauth.socialaccount.signals import social_account_added
 
-from .models import Post, Author, ActivationToken, Category, Subscription
+from .models import Post, Author, ActivationToken, Category, Subscription, Comment, PostCategory
 from .services.email_service import EmailService
+from .services.quota import NewsQuotaService
+from .services.counts import CountService
+from .services.categories import CategorySummaryService
+from .services.groups import GroupService
+from .services.cache import page_cache, post_namespace, POSTS_NAMESPACE
 import logging
 
 # Настройка логгера
@@ -70,7 +75,7 @@ def handle_user_post_save(sender, instance, created, **kwargs):
         logger.info(f"🆕 Резервная обработка пользователя: {instance.username}")
 
         # Проверяем, не обработан ли уже пользователь
-        if not instance.groups.filter(name='common').exists():
+        if not GroupService.in_group(instance, 'common'):
             common_group, created = Group.objects.get_or_create(name='common')
             instance.groups.add(common_group)
 
@@ -129,18 +134,6 @@ def handle_post_save(sender, instance, created, **kwargs):
             logger.info(f"📧 Запланирована отправка уведомлений для нового поста")
             transaction.on_commit(lambda: process_post_notifications(instance))
 
-        # Инвалидация кэша
-        cache_keys = [
-            'latest_news',
-            'news_list',
-            f'post_{instance.id}',
-            'categories_list'
-        ]
-        for key in cache_keys:
-            cache.delete(key)
-
-        logger.debug("🧹 Кэш очищен после создания поста")
-
 
 def process_post_notifications(post):
     """
@@ -150,7 +143,7 @@ def process_post_notifications(post):
 
     try:
         # Перезагружаем пост для получения актуальных данных
-        refreshed_post = Post.objects.select_related('author__user').prefetch_related('categories').get(pk=post.pk)
+        refreshed_post = Post.objects.select_related('author__user').prefetch_related('categories').defer('content').get(pk=post.pk)
 
         # Отправляем уведомления в зависимости от типа поста
         if refreshed_post.post_type == Post.NEWS:
@@ -179,10 +172,10 @@ def handle_activation_token_save(sender, instance, created, **kwargs):
 
         try:
             EmailService.send_activation_success_email(instance.user)
-            logger.info(f"📧 Письмо об успешной активации отправлено на {instance.user.email}")
+            logger.info(f"📧 Письмо об успешной активации поставлено в очередь для {instance.user.email}")
 
             # Добавляем пользователя в группу authors при необходимости
-            if not instance.user.groups.filter(name='authors').exists():
+            if not GroupService.is_author(instance.user):
                 authors_group, created = Group.objects.get_or_create(name='authors')
                 instance.user.groups.add(authors_group)
                 logger.info(f"👤 Пользователь {instance.user.username} добавлен в группу authors")
@@ -199,10 +192,8 @@ def handle_new_subscription(sender, instance, created, **kwargs):
     """
     if created:
         logger.info(f"📩 Новая подписка: {instance.user.username} -> {instance.category.name}")
-        print(f"🎯 сигнал: новая подписка создана - {instance.user.username} -> {instance.category.name}")
         # Инвалидация кэша подписок
         cache.delete(f"user_{instance.user.id}_subscriptions")
-        cache.delete(f"category_{instance.category.id}_subscribers_count")
 
 
 @receiver(post_delete, sender=Subscription)
@@ -214,7 +205,192 @@ def handle_subscription_removed(sender, instance, **kwargs):
 
     # Инвалидация кэша подписок
     cache.delete(f"user_{instance.user.id}_subscriptions")
-    cache.delete(f"category_{instance.category.id}_subscribers_count")
+
+
+# 🆕 ИНВАЛИДАЦИЯ ВЕРСИОНИРОВАННОГО КЭША СТРАНИЦ
+def bump_post_cache(*post_ids):
+    """Новое поколение для списков и страниц перечисленных постов (после коммита)"""
+    namespaces = [POSTS_NAMESPACE] + [post_namespace(post_id) for post_id in post_ids]
+    transaction.on_commit(lambda: page_cache.bump(*namespaces))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def handle_post_cache(sender, instance, **kwargs):
+    bump_post_cache(instance.pk)
+
+
+@receiver(post_save, sender=PostCategory)
+@receiver(post_delete, sender=PostCategory)
+def handle_post_category_cache(sender, instance, **kwargs):
+    bump_post_cache(instance.post_id)
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+def handle_post_categories_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_post_cache(instance.pk)
+    elif pk_set:
+        bump_post_cache(*pk_set)
+    else:
+        # Очистка категорий со стороны категории: затронутые посты неизвестны
+        bump_post_cache()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def handle_comment_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: page_cache.bump(post_namespace(instance.post_id)))
+
+
+# 🆕 ИНВАЛИДАЦИЯ СВОДКИ КАТЕГОРИЙ (меню и боковые панели)
+@receiver(post_save, sender=PostCategory)
+@receiver(post_delete, sender=PostCategory)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def handle_category_summary(sender, **kwargs):
+    transaction.on_commit(CategorySummaryService.invalidate)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def handle_category_names(sender, **kwargs):
+    transaction.on_commit(CategorySummaryService.invalidate_names)
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+def handle_category_summary_posts(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(CategorySummaryService.invalidate)
+
+
+@receiver(m2m_changed, sender=Category.subscribers.through)
+def handle_category_summary_subscribers(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    transaction.on_commit(CategorySummaryService.invalidate)
+    # Подписки пользователя для отметок в меню
+    if reverse:
+        CategorySummaryService.forget_subscriptions(instance.pk)
+    elif pk_set:
+        CategorySummaryService.forget_subscriptions(*pk_set)
+
+
+# 🆕 СИГНАЛЫ ДЛЯ ДНЕВНОГО ЛИМИТА НОВОСТЕЙ
+@receiver(post_save, sender=Post)
+def handle_news_quota_published(sender, instance, created, **kwargs):
+    if created and instance.post_type == Post.NEWS:
+        transaction.on_commit(lambda: NewsQuotaService.record_published(instance))
+
+
+@receiver(post_delete, sender=Post)
+def handle_news_quota_deleted(sender, instance, **kwargs):
+    if instance.post_type == Post.NEWS:
+        transaction.on_commit(lambda: NewsQuotaService.record_deleted(instance))
+
+
+# 🆕 СИГНАЛЫ ДЛЯ СЧЕТЧИКОВ
+# Удаление связей (remove, clear, каскад от поста или категории) проходит через
+# post_delete строк PostCategory/Subscription, а add() вставляет их через
+# bulk_create без post_save - поэтому добавления считаются по m2m_changed
+@receiver(post_save, sender=Post)
+def handle_news_count_created(sender, instance, created, **kwargs):
+    if created and instance.post_type == Post.NEWS:
+        transaction.on_commit(lambda: CountService.news_changed(1))
+
+
+@receiver(post_delete, sender=Post)
+def handle_news_count_deleted(sender, instance, **kwargs):
+    if instance.post_type == Post.NEWS:
+        transaction.on_commit(lambda: CountService.news_changed(-1))
+
+
+@receiver(post_save, sender=Category)
+def handle_category_count_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: CountService.categories_changed(1))
+
+
+@receiver(post_delete, sender=Category)
+def handle_category_count_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: CountService.categories_changed(-1))
+
+
+@receiver(post_save, sender=PostCategory)
+def handle_category_posts_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: CountService.category_posts_changed([instance.category_id], 1))
+
+
+@receiver(post_delete, sender=PostCategory)
+def handle_category_posts_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: CountService.category_posts_changed([instance.category_id], -1))
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+def handle_category_posts_added(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        category_ids, delta = [instance.pk], len(pk_set)
+    else:
+        category_ids, delta = list(pk_set), 1
+    transaction.on_commit(lambda: CountService.category_posts_changed(category_ids, delta))
+
+
+@receiver(post_save, sender=Subscription)
+def handle_subscribers_count_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: CountService.category_subscribers_changed([instance.category_id], 1))
+
+
+@receiver(post_delete, sender=Subscription)
+def handle_subscribers_count_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: CountService.category_subscribers_changed([instance.category_id], -1))
+
+
+@receiver(m2m_changed, sender=Category.subscribers.through)
+def handle_subscribers_count_added(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        category_ids, delta = list(pk_set), 1
+    else:
+        category_ids, delta = [instance.pk], len(pk_set)
+    transaction.on_commit(lambda: CountService.category_subscribers_changed(category_ids, delta))
+
+
+# 🆕 СИГНАЛЫ ДЛЯ РЕЙТИНГА АВТОРОВ
+# Рейтинг поддерживается приращениями: голоса меняют его в Post.vote/Comment.vote,
+# здесь учитываются создание с ненулевым рейтингом и удаление
+@receiver(post_save, sender=Post)
+def handle_post_rating_created(sender, instance, created, **kwargs):
+    if created and instance.rating:
+        Author.apply_rating_delta(instance.rating * Author.POST_RATING_WEIGHT, author_id=instance.author_id)
+
+
+@receiver(pre_delete, sender=Post)
+def handle_post_rating_deleted(sender, instance, **kwargs):
+    # Рейтинг из БД: копия поста могла быть загружена до голосования
+    rating = Post.objects.filter(pk=instance.pk).values_list('rating', flat=True).first() or 0
+    Author.apply_rating_delta(-rating * Author.POST_RATING_WEIGHT, author_id=instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def handle_comment_rating_created(sender, instance, created, **kwargs):
+    if created and instance.rating:
+        Author.apply_rating_delta(instance.rating, user_id=instance.user_id)
+        Author.apply_rating_delta(instance.rating, post_id=instance.post_id)
+
+
+@receiver(pre_delete, sender=Comment)
+def handle_comment_rating_deleted(sender, instance, **kwargs):
+    # pre_delete: при каскадном удалении поста его строка еще существует
+    rating = Comment.objects.filter(pk=instance.pk).values_list('rating', flat=True).first() or 0
+    Author.apply_rating_delta(-rating, user_id=instance.user_id)
+    Author.apply_rating_delta(-rating, post_id=instance.post_id)
 
 
 # 🔄 СИГНАЛЫ ДЛЯ ОЧИСТКИ
@@ -226,10 +402,6 @@ def handle_new_comment(sender, instance, created, **kwargs):
     if created:
         logger.info(f"💬 Новый комментарий от {instance.user.username} к посту '{instance.post.title}'")
 
-        # Инвалидация кэша комментариев
-        cache.delete(f"post_{instance.post.id}_comments")
-        cache.delete(f"post_{instance.post.id}_comments_count")
-
 
 def cleanup_expired_tokens():
     """
@@ -257,4 +429,31 @@ def handle_new_article_for_weekly_digest(sender, instance, created, **kwargs):
     Обрабатывает создание новых статей для еженедельной рассылки
     """
     if created and instance.post_type == Post.ARTICLE:
-        logger.info(f"📄 Новая статья создана: '{instance.title}' - будет включена в еженедельный дайджест")
\ No newline at end of file
+        logger.info(f"📄 Новая статья создана: '{instance.title}' - будет включена в еженедельный дайджест")
+
+
+# 🆕 СИГНАЛЫ ДЛЯ КЭША ГРУПП ПОЛЬЗОВАТЕЛЕЙ
+@receiver(m2m_changed, sender=User.groups.through)
+def handle_user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        user_ids = [instance.pk]
+        GroupService.forget(instance)
+    elif reverse and action in ('post_add', 'post_remove'):
+        user_ids = list(pk_set)
+        GroupService.forget(*user_ids)
+    elif reverse and action == 'pre_clear':
+        # После очистки group.user_set участников уже не узнать
+        user_ids = list(instance.user_set.values_list('pk', flat=True))
+        GroupService.forget(*user_ids)
+    else:
+        return
+    # Параллельный запрос мог перечитать группы до коммита
+    transaction.on_commit(lambda: GroupService.forget(*user_ids))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def handle_group_changed(sender, instance, created=False, **kwargs):
+    # Переименование или удаление группы меняет имена групп у всех ее участников
+    if not created:
+        GroupService.forget(*instance.user_set.values_list('pk', flat=True))
@@ -1,42 +1,59 @@
 from django import template
 from django.utils.html import strip_tags
-import re
+from django.utils.safestring import mark_safe
 
-register = template.Library()
+from news.services.censor import get_censor_engine
+from news.services.fragments import FragmentCache
+from news.services.groups import GroupService
 
-# Список нежелательных слов (можно расширить)
-UNWANTED_WORDS = [
-    'редиска', 'плохой',
-    'дурак',
-]
+register = template.Library()
 
 
-@register.filter(name='censor')
+@register.filter(name='censor', is_safe=True)
 def censor(value):
     """
-    Фильтр для цензурирования нежелательных слов.
+    Фильтр для цензурирования нежелательных слов (CENSOR_WORDS в настройках).
     Заменяет все буквы в нежелательных словах на '*', кроме первой.
     """
     if not isinstance(value, str):
         return value
 
-    censored_text = value
-    for word in UNWANTED_WORDS:
-        # Заменяем слово, сохраняя регистр
-        pattern = re.compile(re.escape(word), re.IGNORECASE)
-        censored_text = pattern.sub(
-            lambda match: match.group()[0] + '*' * (len(match.group()) - 1),
-            censored_text
-        )
-
-    return censored_text
+    return get_censor_engine().censor(value)
 
 
 @register.simple_tag
 def is_user_in_group(user, group_name):
     """Проверяет, находится ли пользователь в указанной группе"""
-    return user.groups.filter(name=group_name).exists()
-
-
+    return GroupService.in_group(user, group_name)
+
+
+class PostFragmentNode(template.Node):
+    def __init__(self, nodelist, post, name):
+        self.nodelist = nodelist
+        self.post = post
+        self.name = name
+
+    def render(self, context):
+        post = self.post.resolve(context)
+        name = self.name.resolve(context)
+        # Поколение фрагментов читается из кэша один раз на отрисовку шаблона, а не на строку
+        if 'post_fragment_generation' not in context.render_context:
+            context.render_context['post_fragment_generation'] = FragmentCache.generation()
+        generation = context.render_context['post_fragment_generation']
+        return mark_safe(
+            FragmentCache.get_or_render(name, post, lambda: self.nodelist.render(context), generation)
+        )
 
 
+@register.tag('cachepost')
+def cachepost(parser, token):
+    """
+    {% cachepost post 'имя' %}...{% endcachepost %} - фрагмент поста из кэша.
+    Ключ: имя, id поста и updated_at; внутрь выносятся только данные, меняющиеся при сохранении поста.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' принимает пост и имя фрагмента")
+    nodelist = parser.parse(('endcachepost',))
+    parser.delete_first_token()
+    return PostFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
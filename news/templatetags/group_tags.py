@@ -1,11 +1,18 @@
 from django import template
 
+from news.services.groups import GroupService
+
 register = template.Library()
 
 @register.filter
 def in_group(user, group_name):
     """Проверяет, находится ли пользователь в указанной группе"""
-    return user.groups.filter(name=group_name).exists()
+    return GroupService.in_group(user, group_name)
+
+@register.filter
+def group_names(user):
+    """Имена групп пользователя по алфавиту"""
+    return sorted(GroupService.group_names(user))
 
 @register.filter
 def has_perm_for_model(user, model_name):
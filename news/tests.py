@@ -1,3 +1,654 @@
-from django.test import TestCase
+import base64
+from datetime import timedelta
+from io import StringIO
+import json
+import re
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from news.models import Author, Category, Comment, DigestDelivery, EmailOutbox, Post, Subscription
+from news.pagination import CursorPaginator, InvalidCursor
+from news.services.categories import CategorySummaryService
+from news.services.censor import CensorEngine, censor_text
+from news.services.digest import DigestPlanner
+from news.services.email_service import EmailService
+from news.services.groups import GroupService
+from news.services.leaderboard import Leaderboard
+from news.services.load_generator import LoadGenerator
+from news.services.outbox import OutboxService
+from news.services.quota import NewsQuotaService
+from news.services.ratings import RatingService
+from news.services.votes import VoteBuffer
+from news.views import NewsList, NewsSearch
+
+# Большие таблицы, полный проход по которым недопустим; справочник категорий маленький
+HOT_TABLES = ('news_post', 'news_postcategory', 'news_subscription')
+FULL_SCAN = re.compile(r'^SCAN (%s)\b' % '|'.join(HOT_TABLES))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть только в SQLite')
+@override_settings(VOTE_FLUSH_INTERVAL=0)
+class HotPathQueryPlanTests(TestCase):
+    """Запросы горячих путей должны находить строки по индексам, а не сканировать таблицы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seeded = LoadGenerator(seed=1).seed(authors=3, categories=3, posts=60, subscribers=30)
+        cls.category = seeded['categories'][0]
+        cls.author = seeded['authors'][0]
+        news_ids = list(Post.objects.values_list('pk', flat=True)[:30])
+        Post.objects.filter(pk__in=news_ids).update(post_type=Post.NEWS)
+
+    def setUp(self):
+        # Кэш процесса переживает откат транзакции теста: страницы и счетчики прошлых тестов не нужны
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, func):
+        """Выполняет func и проверяет план каждого SELECT по большим таблицам"""
+        with CaptureQueriesContext(connection) as queries:
+            func()
+
+        checked = 0
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(f'"{table}"' in sql for table in HOT_TABLES):
+                continue
+            checked += 1
+            plan = self.explain(sql)
+            scans = [step for step in plan if FULL_SCAN.match(step)]
+            self.assertFalse(scans, f"Полный проход по таблице:\n{sql}\n{plan}")
+        self.assertTrue(checked, 'Не выполнено ни одного запроса к проверяемым таблицам')
+
+    def test_news_list(self):
+        view = NewsList()
+        self.assertNoFullScan(lambda: list(view.get_queryset()[:10]))
+        self.assertNoFullScan(lambda: Post.objects.filter(post_type=Post.NEWS).count())
+
+    def test_news_list_deep_cursor(self):
+        paginator = CursorPaginator(Post.objects.filter(post_type=Post.NEWS), 5)
+        page = paginator.page()
+        for _ in range(4):
+            page = paginator.page(page.next_cursor)
+        self.assertNoFullScan(lambda: paginator.page(page.next_cursor))
+        self.assertNoFullScan(lambda: paginator.page(page.previous_cursor))
+
+    def test_news_search(self):
+        request = RequestFactory().get('/news/search/', {
+            'title': 'новости',
+            'author__user__username': 'author',
+            'created_after': '2020-01-01',
+        })
+        view = NewsSearch()
+        view.setup(request)
+        self.assertNoFullScan(lambda: list(view.get_queryset()[:10]))
+
+    def test_category_posts(self):
+        # Сводка категорий для меню - агрегат по всей таблице, строится только при промахе кэша
+        CategorySummaryService.summary()
+        self.assertNoFullScan(lambda: self.client.get(f'/news/category/{self.category.pk}/'))
+
+    def test_news_limit(self):
+        author = Author.objects.get(pk=self.author.pk)
+        self.assertNoFullScan(lambda: NewsQuotaService.used(author))
+
+        # Post.clean читает тот же счетчик в кэше: без запросов к БД
+        post = Post(author=Author.objects.get(pk=self.author.pk), post_type=Post.NEWS)
+        with self.assertNumQueries(0), self.assertRaises(ValidationError):
+            post.clean()
+
+    def test_weekly_digest(self):
+        self.assertNoFullScan(EmailService.send_weekly_digest)
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_BACKOFF=60,
+                   EMAIL_OUTBOX_MAX_BACKOFF=100, EMAIL_OUTBOX_LOCK_TIMEOUT=600)
+class OutboxServiceTests(TestCase):
+    """Захват, повторы, dead-letter и порядок полос очереди писем"""
+
+    def enqueue(self, count, lane=EmailOutbox.BULK):
+        OutboxService.enqueue(
+            OutboxService.build(f'user{i}@example.com', 'Тема', 'Текст', lane=lane) for i in range(count)
+        )
+
+    def test_claim_locks_rows_once(self):
+        self.enqueue(3)
+        first = OutboxService.claim_batch(2)
+        self.assertEqual(len(first), 2)
+        self.assertTrue(all(row.status == EmailOutbox.SENDING and row.locked_by for row in first))
+        self.assertEqual(len({row.locked_by for row in first}), 1)
+
+        second = OutboxService.claim_batch(10)
+        self.assertEqual([row.pk for row in second], [EmailOutbox.objects.order_by('id').last().pk])
+        self.assertEqual(OutboxService.claim_batch(10), [])
+
+    def test_claim_skips_rows_not_due(self):
+        self.enqueue(1)
+        EmailOutbox.objects.update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(OutboxService.claim_batch(10), [])
+
+    def test_transactional_lane_goes_first(self):
+        self.enqueue(3, lane=EmailOutbox.BULK)
+        self.enqueue(2, lane=EmailOutbox.TRANSACTIONAL)
+
+        batch = OutboxService.claim_batch(3)
+        self.assertEqual([row.lane for row in batch],
+                         [EmailOutbox.TRANSACTIONAL, EmailOutbox.TRANSACTIONAL, EmailOutbox.BULK])
+
+    def test_bulk_limit_caps_bulk_rows_only(self):
+        self.enqueue(3, lane=EmailOutbox.BULK)
+        self.enqueue(2, lane=EmailOutbox.TRANSACTIONAL)
+
+        batch = OutboxService.claim_batch(10, bulk_limit=1)
+        self.assertEqual(sum(row.lane == EmailOutbox.TRANSACTIONAL for row in batch), 2)
+        self.assertEqual(sum(row.lane == EmailOutbox.BULK for row in batch), 1)
+
+    def test_mark_failed_backs_off_then_dead_letters(self):
+        self.enqueue(1)
+        delays = []
+        for _ in range(2):
+            row = OutboxService.claim_batch(1)[0]
+            before = timezone.now()
+            OutboxService.mark_failed(row, 'SMTP 451')
+            row.refresh_from_db()
+            self.assertEqual(row.status, EmailOutbox.PENDING)
+            self.assertEqual(row.locked_by, '')
+            delays.append(round((row.next_attempt_at - before).total_seconds()))
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        # Задержка удваивается и упирается в EMAIL_OUTBOX_MAX_BACKOFF
+        self.assertEqual(delays, [60, 100])
+
+        row = OutboxService.claim_batch(1)[0]
+        OutboxService.mark_failed(row, 'SMTP 550')
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts, row.last_error), (EmailOutbox.DEAD, 3, 'SMTP 550'))
+        self.assertEqual(OutboxService.claim_batch(10), [])
+
+    def test_release_stale_returns_only_expired_locks(self):
+        self.enqueue(2)
+        stale, fresh = OutboxService.claim_batch(2)
+        EmailOutbox.objects.filter(pk=stale.pk).update(locked_at=timezone.now() - timedelta(seconds=601))
+
+        self.assertEqual(OutboxService.release_stale(), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, stale.locked_by, stale.locked_at), (EmailOutbox.PENDING, '', None))
+        self.assertEqual(fresh.status, EmailOutbox.SENDING)
+        self.assertEqual([row.pk for row in OutboxService.claim_batch(10)], [stale.pk])
+
+
+@override_settings(VOTE_FLUSH_INTERVAL=0)
+class RatingConsistencyTests(TestCase):
+    """Сохранение и перенос постов и комментариев не расходятся с приращениями рейтинга"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('writer').author
+        self.other = User.objects.create_user('other').author
+        self.post = Post.objects.create(author=self.author, title='Заголовок', content='Текст')
+        self.comment = Comment.objects.create(post=self.post, user=self.other.user, text='Комментарий')
+
+    def assertNoDrift(self):
+        self.assertEqual(RatingService.find_drift()[1], [])
+
+    def test_stale_post_save_keeps_votes(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Post.objects.get(pk=self.post.pk).like()
+        stale.title = 'Новый заголовок'
+        stale.save()
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.rating, self.post.title), (1, 'Новый заголовок'))
+        self.assertNoDrift()
+
+    def test_stale_comment_save_keeps_votes(self):
+        stale = Comment.objects.get(pk=self.comment.pk)
+        Comment.objects.get(pk=self.comment.pk).like()
+        stale.text = 'Исправленный комментарий'
+        stale.save()
+
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.rating, 1)
+        self.assertNoDrift()
+
+    def test_post_author_change_moves_rating(self):
+        self.post.like()
+        self.comment.like()
+        post = Post.objects.get(pk=self.post.pk)
+        post.author = self.other
+        post.save()
+
+        self.author.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.author.rating, self.other.rating), (0, 5))
+        self.assertNoDrift()
+
+    def test_comment_move_moves_rating(self):
+        self.comment.like()
+        target = Post.objects.create(author=self.other, title='Другой пост', content='Текст')
+        comment = Comment.objects.get(pk=self.comment.pk)
+        comment.post = target
+        comment.user = self.author.user
+        comment.save()
+
+        self.assertNoDrift()
+
+    def test_comment_rating_updates_leaderboard_in_place(self):
+        board = Leaderboard(refresh_interval=3600)
+        board.reload()
+        with mock.patch('news.services.leaderboard.leaderboard', board), \
+                self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, user=self.other.user, text='Еще', rating=2)
+
+        # Рейтинг в памяти изменен приращением, без перечитывания таблицы авторов
+        with self.assertNumQueries(0):
+            self.assertEqual(board.rank(self.author.pk)['rating'], 2)
+            self.assertEqual(board.rank(self.other.pk)['rating'], 2)
+
+    def test_update_rating_resets_leaderboard(self):
+        Post.objects.filter(pk=self.post.pk).update(rating=4)
+        board = Leaderboard(refresh_interval=3600)
+        board.reload()
+        with mock.patch('news.services.leaderboard.leaderboard', board), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.author.update_rating()
+
+        self.assertEqual(board.rank(self.author.pk)['rating'], 12)
+
+    def test_delete_uses_stored_rating(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        self.post.like()
+        self.comment.like()
+        stale.delete()
+
+        self.assertNoDrift()
+
+    def test_seeded_ratings_match_recompute(self):
+        # Без подписчиков комментарии пишут авторы, рейтинги пересчитываются в конце seed()
+        seeded = LoadGenerator(seed=5).seed(authors=3, categories=2, posts=10, subscribers=0, comments=20)
+
+        self.assertEqual(seeded['comments'], 20)
+        self.assertTrue(any(author.rating for author in seeded['authors']))
+        self.assertNoDrift()
+
+
+class VoteBufferTests(TestCase):
+    """Голоса копятся в буфере, записываются одним приращением и не теряются при ошибке"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('writer').author
+        self.reader = User.objects.create_user('reader').author
+        self.post = Post.objects.create(author=self.author, title='Заголовок', content='Текст')
+        self.comment = Comment.objects.create(post=self.post, user=self.reader.user, text='Комментарий')
+        self.buffer = VoteBuffer(interval=60)
+        # Фоновый поток сброса в тестах не нужен: flush вызывается явно
+        patcher = mock.patch.object(self.buffer, '_ensure_started')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ratings(self):
+        return (
+            Post.objects.get(pk=self.post.pk).rating,
+            Comment.objects.get(pk=self.comment.pk).rating,
+            Author.objects.get(pk=self.author.pk).rating,
+            Author.objects.get(pk=self.reader.pk).rating,
+        )
+
+    def test_flush_coalesces_votes(self):
+        for _ in range(3):
+            self.buffer.add(self.post, 1)
+        self.buffer.add(self.post, -1)
+        self.buffer.add(self.comment, 1)
+
+        self.assertEqual(self.buffer.pending(), 2)
+        self.assertEqual(self.ratings(), (0, 0, 0, 0))
+        with CaptureQueriesContext(connection) as queries:
+            self.buffer.flush()
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        # Пост, комментарий и по строке на каждого из двух авторов
+        self.assertEqual(len(updates), 4)
+        self.assertEqual(self.ratings(), (2, 1, 2 * Author.POST_RATING_WEIGHT + 1, 1))
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(RatingService.find_drift()[1], [])
+
+    def test_add_does_not_touch_instance(self):
+        self.buffer.add(self.post, 1)
+        self.post.title = 'Новый заголовок'
+        self.post.save()
+        self.buffer.flush()
+
+        self.assertEqual(self.post.rating, 0)
+        self.assertEqual(self.ratings()[0], 1)
+        self.assertEqual(RatingService.find_drift()[1], [])
+
+    def test_failed_flush_requeues_votes(self):
+        self.buffer.add(self.post, 1)
+        with mock.patch.object(VoteBuffer, '_apply', side_effect=RuntimeError('database is locked')):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.pending(), 1)
+
+        self.buffer.add(self.post, 1)
+        self.buffer.flush()
+        self.assertEqual(self.ratings()[0], 2)
+        self.assertEqual(self.buffer.pending(), 0)
+
+    @override_settings(VOTE_FLUSH_INTERVAL=0)
+    def test_disabled_buffer_writes_immediately(self):
+        buffer = VoteBuffer()
+        buffer.add(self.comment, -1)
+
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(self.ratings(), (0, -1, -1, -1))
+
+
+class CursorPaginatorTests(TestCase):
+    """Курсорные страницы совпадают со страницами OFFSET в обе стороны, включая одинаковое время"""
+
+    @classmethod
+    def setUpTestData(cls):
+        LoadGenerator(seed=2).seed(authors=2, categories=1, posts=23, subscribers=0)
+        # По три поста на одно время: граница страницы попадает внутрь группы
+        start = timezone.now() - timedelta(days=1)
+        for index, pk in enumerate(Post.objects.order_by('pk').values_list('pk', flat=True)):
+            Post.objects.filter(pk=pk).update(created_at=start + timedelta(minutes=index // 3))
+
+    def setUp(self):
+        self.queryset = Post.objects.all()
+        self.paginator = CursorPaginator(self.queryset, 5)
+        offset = Paginator(self.queryset.order_by('-created_at', '-pk'), 5)
+        self.expected = [[post.pk for post in offset.page(number)] for number in offset.page_range]
+
+    def test_forward_and_back_match_offset_pages(self):
+        page = self.paginator.page()
+        pages = [page]
+        while page.has_next():
+            page = self.paginator.page(page.next_cursor)
+            pages.append(page)
+        self.assertEqual([[post.pk for post in page] for page in pages], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        backward = []
+        while page.has_previous():
+            page = self.paginator.page(page.previous_cursor)
+            backward.append([post.pk for post in page])
+        self.assertEqual(backward, self.expected[-2::-1])
+
+    def cursor(self, payload):
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+    def test_malformed_cursors_are_rejected(self):
+        for cursor in [
+            '!!!',
+            self.cursor(['n', [None, None]]),
+            self.cursor(['n', ['2026-01-01T00:00:00+00:00', None]]),
+            self.cursor(['n', ['не дата', 1]]),
+            self.cursor(['x', ['2026-01-01T00:00:00+00:00', 1]]),
+            self.cursor(['n', ['2026-01-01T00:00:00+00:00']]),
+            self.cursor(['n', 5]),
+        ]:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator.page(cursor)
+
+    def test_view_answers_404_for_null_cursor(self):
+        Post.objects.update(post_type=Post.NEWS)
+        response = self.client.get('/news/', {'cursor': self.cursor(['n', [None, None]])})
+        self.assertEqual(response.status_code, 404)
+
+
+class AnonymousPageCacheTests(TestCase):
+    """Кэш страниц для гостей: ETag без Last-Modified и сброс только нужными изменениями"""
+
+    @classmethod
+    def setUpTestData(cls):
+        LoadGenerator(seed=3).seed(authors=2, categories=2, posts=12, subscribers=2)
+        Post.objects.update(post_type=Post.NEWS)
+        cls.category = Category.objects.order_by('pk').first()
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url='/news/', **headers):
+        response = self.client.get(url, **headers)
+        # Шаблоны отрисовываются только при промахе кэша страницы
+        return response, bool(response.templates)
+
+    def test_etag_revalidation(self):
+        first, rendered = self.get()
+        self.assertTrue(rendered)
+        self.assertNotIn('Last-Modified', first)
+
+        # Попадание не стоит ни одного запроса: статистика кэша не пишется в хранилище
+        with self.assertNumQueries(0):
+            second, rendered = self.get()
+        self.assertFalse(rendered)
+        self.assertEqual(second['ETag'], first['ETag'])
+        not_modified, _ = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_delete_changes_page(self):
+        first, _ = self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.order_by('-created_at').first().delete()
+
+        # Без Last-Modified один If-Modified-Since не дает 304 со старой страницей
+        response, _ = self.get(HTTP_IF_MODIFIED_SINCE='Sun, 01 Jan 2034 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        response, _ = self.get(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_subscription_keeps_pages_cached(self):
+        self.get()
+        self.get(f'/news/category/{self.category.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(user=User.objects.create_user('reader'), category=self.category)
+
+        self.assertFalse(self.get()[1])
+        self.assertFalse(self.get(f'/news/category/{self.category.pk}/')[1])
+
+    def test_category_rename_resets_pages(self):
+        first, _ = self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Переименованная категория'
+            self.category.save()
+
+        response, rendered = self.get()
+        self.assertTrue(rendered)
+        self.assertContains(response, 'Переименованная категория')
+
+
+class WeeklyDigestShardTests(TestCase):
+    """Шарды рассылки не пересекаются, а повторный запуск пропускает записанные в журнал подписки"""
+
+    @classmethod
+    def setUpTestData(cls):
+        LoadGenerator(seed=4).seed(authors=2, categories=2, posts=6, subscribers=17, subscriptions_per_user=2)
+        # У каждой категории есть статьи недели, поэтому дайджест нужен всем подпискам
+        Post.objects.first().categories.add(*Category.objects.all())
+
+    def test_shards_partition_subscriptions(self):
+        all_ids = set(Subscription.objects.values_list('pk', flat=True))
+        ranges = DigestPlanner.shard_ranges(3)
+        # Подписка, созданная после расчета границ, попадает в крайний открытый диапазон
+        late = Subscription.objects.create(user=User.objects.create_user('late'), category=Category.objects.first())
+        all_ids.add(late.pk)
+
+        shards = [
+            set(DigestPlanner.shard_queryset(3, shard, bounds).values_list('pk', flat=True))
+            for shard, bounds in enumerate(ranges)
+        ]
+        self.assertEqual(set().union(*shards), all_ids)
+        self.assertEqual(sum(len(shard) for shard in shards), len(all_ids))
+        self.assertTrue(all(shards))
+
+    def test_resume_skips_ledger_rows(self):
+        week = DigestPlanner.week_key()
+        total = Subscription.objects.count()
+        done = list(Subscription.objects.order_by('pk')[:5])
+        # Прерванный запуск успел записать в журнал первые подписки
+        DigestDelivery.objects.bulk_create([DigestDelivery(subscription=sub, week=week) for sub in done])
+
+        result = EmailService.send_weekly_digest(chunk_size=4, week=week)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['sent'], total - len(done))
+        self.assertEqual(EmailOutbox.objects.count(), total - len(done))
+        self.assertEqual(DigestDelivery.objects.filter(week=week).count(), total)
+
+        self.assertEqual(EmailService.send_weekly_digest(chunk_size=4, week=week)['sent'], 0)
+
+
+@override_settings(CENSOR_WORDS=['редиска', 'плох', 'плохой', 'дурак'])
+class CensorTests(TestCase):
+    """Цензор: регистр, общие префиксы, границы слов и экранирование в фильтре"""
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, template, **context):
+        return Template('{% load custom_filters %}' + template).render(Context(context))
+
+    def test_case_insensitive(self):
+        self.assertEqual(censor_text('ДУРАК, Дурак и дУрАк'), 'Д****, Д**** и д****')
+
+    def test_longest_of_overlapping_words(self):
+        self.assertEqual(censor_text('плохой'), 'п*****')
+        self.assertEqual(censor_text('Плохая погода'), 'П***ая погода')
+        self.assertEqual(CensorEngine(['плохой', 'плох']).censor('плохо'), 'п***о')
+
+    def test_word_boundaries(self):
+        # Как и прежний фильтр, слово маскируется и внутри более длинных слов
+        self.assertEqual(censor_text('дураки'), 'д****и')
+        self.assertEqual(censor_text('редиска,дурак!'), 'р******,д****!')
+        self.assertEqual(censor_text('добрый день'), 'добрый день')
+
+    def test_filter_escapes_html(self):
+        self.assertEqual(
+            self.render('{{ text|censor }}', text='<script>дурак</script>'),
+            '&lt;script&gt;д****&lt;/script&gt;'
+        )
+        self.assertEqual(
+            self.render('{{ text|censor }}', text=mark_safe('<b>дурак</b>')), '<b>д****</b>'
+        )
+        self.assertEqual(
+            self.render('{% autoescape off %}{{ text|censor }}{% endautoescape %}', text='<i>плох</i>'),
+            '<i>п***</i>'
+        )
+
+    def test_titles_censored_on_category_page_and_digest(self):
+        author = User.objects.create_user('writer').author
+        category = Category.objects.create(name='Общество')
+        post = Post.objects.create(
+            author=author, post_type=Post.ARTICLE, title='Плохой день', content='Текст', notifications_sent=True
+        )
+        post.categories.add(category)
+        Subscription.objects.create(user=User.objects.create_user('reader', 'reader@example.com'), category=category)
+
+        response = self.client.get(f'/news/category/{category.pk}/')
+        self.assertContains(response, 'П***** день')
+        self.assertNotContains(response, 'Плохой')
+
+        EmailService.send_weekly_digest()
+        email = EmailOutbox.objects.get(to_email='reader@example.com')
+        for body in (email.body, email.html_body):
+            self.assertIn('П***** день', body)
+            self.assertNotIn('Плохой', body)
+
+
+@override_settings(CENSOR_WORDS=['дурак'])
+class FragmentCacheTests(TestCase):
+    """Фрагменты поста обновляются после правки поста и после смены списка цензуры"""
+
+    template = Template(
+        "{% load custom_filters %}{% cachepost post 'card' %}"
+        "{{ post.censored_title }}|{{ post.content|censor }}{% endcachepost %}"
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=User.objects.create_user('writer').author, title='Обычный текст', content='Текст про дурака'
+        )
+
+    def render(self):
+        return self.template.render(Context({'post': Post.objects.get(pk=self.post.pk)}))
+
+    def test_post_edit_renders_fresh_fragment(self):
+        self.assertEqual(self.render(), 'Обычный текст|Текст про д****а')
+        self.post.content = 'Новый текст'
+        self.post.save()
+        self.assertEqual(self.render(), 'Обычный текст|Новый текст')
+
+    def test_censor_change_renders_fresh_fragment(self):
+        self.assertEqual(self.render(), 'Обычный текст|Текст про д****а')
+        with override_settings(CENSOR_WORDS=['текст']):
+            # Фильтр |censor внутри фрагмента: ключ меняется вместе со списком слов
+            self.assertEqual(self.render(), 'Обычный текст|Т**** про дурака')
+            # Сохраненный заголовок пересчитывается bulk_update без смены updated_at
+            call_command('backfill_post_previews', stdout=StringIO())
+            self.assertEqual(self.render(), 'Обычный т****|Т**** про дурака')
+
+
+class GroupServiceTests(TestCase):
+    """is_author меняется сразу после изменения групп, несмотря на кэш имен групп"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('member')
+        self.authors, _ = Group.objects.get_or_create(name='authors')
+
+    def fresh(self):
+        # Следующий запрос получает новый объект пользователя: память только в кэше
+        return User.objects.get(pk=self.user.pk)
+
+    def assertAuthor(self, expected):
+        self.assertIs(GroupService.is_author(self.user), expected)
+        self.assertIs(GroupService.is_author(self.fresh()), expected)
+
+    def test_user_groups_add_remove_clear(self):
+        self.assertAuthor(False)
+        self.user.groups.add(self.authors)
+        self.assertAuthor(True)
+        self.user.groups.remove(self.authors)
+        self.assertAuthor(False)
+        self.user.groups.add(self.authors)
+        self.assertAuthor(True)
+        self.user.groups.clear()
+        self.assertAuthor(False)
+
+    def test_group_user_set_changes(self):
+        self.assertFalse(GroupService.is_author(self.fresh()))
+        self.authors.user_set.add(self.user)
+        self.assertTrue(GroupService.is_author(self.fresh()))
+        self.authors.user_set.remove(self.user)
+        self.assertFalse(GroupService.is_author(self.fresh()))
+        self.authors.user_set.add(self.user)
+        self.assertTrue(GroupService.is_author(self.fresh()))
+        self.authors.user_set.clear()
+        self.assertFalse(GroupService.is_author(self.fresh()))
+
+    def test_group_rename_and_delete(self):
+        editors = Group.objects.create(name='editors')
+        self.user.groups.add(editors)
+        self.assertFalse(GroupService.is_author(self.fresh()))
+
+        self.authors.delete()
+        editors.name = 'authors'
+        editors.save()
+        self.assertTrue(GroupService.is_author(self.fresh()))
+
+        editors.delete()
+        self.assertFalse(GroupService.is_author(self.fresh()))
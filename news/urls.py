@@ -26,6 +26,12 @@ urlpatterns = [
     # Авторство
     path('become-author/', views.become_author, name='become_author'),
 
+    # Рейтинг авторов
+    path('authors/leaderboard/', views.author_leaderboard, name='author_leaderboard'),
+    path('api/authors/leaderboard/', views.author_leaderboard_json, name='author_leaderboard_json'),
+    path('api/news/', views.news_feed_json, name='news_feed_json'),
+    path('api/cache-stats/', views.cache_stats, name='cache_stats'),
+
     # Активация аккаунта
     path('accounts/activate/<str:token>/', views.ActivationView.as_view(), name='activate_account'),
     path('accounts/resend-activation/', views.resend_activation_email, name='resend_activation'),
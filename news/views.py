@@ -1,22 +1,34 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
+from django.template.response import TemplateResponse
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.core.paginator import Paginator
 from django.contrib.auth.models import Group, Permission
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import UserPassesTestMixin, PermissionRequiredMixin
 from django.contrib.contenttypes.models import ContentType
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Count
 from django.core.exceptions import PermissionDenied
 from django.conf import settings
 
 from .models import Post, Author, Category, Subscription, ActivationToken
+from .decorators import cache_anonymous_page
 from .filters import PostFilter
 from .forms import PostForm
-from .mixins import AuthRequiredMixin, NewsLimitMixin, AuthorRequiredMixin, OwnerRequiredMixin, PermissionRequiredMixinWithMessage
+from .mixins import AuthRequiredMixin, NewsLimitMixin, AuthorRequiredMixin, OwnerRequiredMixin, PermissionRequiredMixinWithMessage, \
+    CachedPaginationMixin, CursorPaginationMixin
+from .pagination import CountedPaginator, CursorPaginator, InvalidCursor
 from .services.email_service import EmailService
+from .services.leaderboard import leaderboard
+from .services.quota import NewsQuotaService
+from .services.counts import CountService
+from .services.categories import CategorySummaryService, CATEGORIES_NAMESPACE, CATEGORY_NAMES_NAMESPACE
+from .services.groups import GroupService
+from .services.cache import page_cache, post_namespace, POSTS_NAMESPACE
 import logging
 
 logger = logging.getLogger('news.views')
@@ -34,8 +46,7 @@ class AuthorRequiredMixin(UserPassesTestMixin):
     permission_denied_message = "Только авторы могут создавать и редактировать контент."
 
     def test_func(self):
-        return (self.request.user.is_authenticated and
-                self.request.user.groups.filter(name='authors').exists())
+        return GroupService.is_author(self.request.user)
 
     def handle_no_permission(self):
         messages.error(self.request, self.permission_denied_message)
@@ -106,7 +117,6 @@ def category_posts(request, category_id):
         'category': category,
         'page_obj': page_obj,
         'is_subscribed': is_subscribed,
-        'categories': Category.objects.all(),
         'subscribers_count': category.subscribers.count()
     }
     return render(request, 'news/category_posts.html', context)
@@ -152,21 +162,16 @@ def my_subscriptions(request):
     logger.info(f"🔔 ЗАПРОС МОИ ПОДПИСКИ: пользователь={request.user.username}")
 
     subscriptions = Subscription.objects.filter(user=request.user).select_related('category')
-    all_categories = Category.objects.annotate(
-        subscribers_count=Count('subscribers'),
-        posts_count=Count('post')
-    )
-
     logger.info(f"📋 Найдено подписок: {subscriptions.count()}")
 
     context = {
         'subscriptions': subscriptions,
-        'categories': all_categories,
         'total_subscriptions': subscriptions.count()
     }
     return render(request, 'news/my_subscriptions.html', context)
 
 
+@cache_anonymous_page(lambda request, category_id: [POSTS_NAMESPACE, CATEGORY_NAMES_NAMESPACE])
 def category_posts(request, category_id):
     """Страница с постами категории"""
     logger.info(
@@ -176,12 +181,15 @@ def category_posts(request, category_id):
     logger.info(f"📦 Категория: {category.name}")
 
     posts = Post.objects.filter(categories=category).select_related('author__user').prefetch_related(
-        'categories').order_by('-created_at')
-    logger.info(f"📄 Постов в категории: {posts.count()}")
+        'categories').defer('content').order_by('-created_at')
 
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if 'page' in request.GET:
+        # Старые ссылки с номером страницы
+        paginator = CountedPaginator(posts, 10, count=CountService.category_posts(category.pk))
+        page_obj = paginator.get_page(request.GET.get('page'))
+    else:
+        page_obj = CursorPaginator(posts, 10).get_page(request.GET.get('cursor'))
+    logger.info(f"📄 Постов на странице категории: {len(page_obj.object_list)}")
 
     is_subscribed = False
     if request.user.is_authenticated:
@@ -197,10 +205,9 @@ def category_posts(request, category_id):
         'category': category,
         'page_obj': page_obj,
         'is_subscribed': is_subscribed,
-        'categories': Category.objects.all(),
-        'subscribers_count': category.subscribers.count()
+        'subscribers_count': CountService.category_subscribers(category.pk)
     }
-    return render(request, 'news/category_posts.html', context)
+    return TemplateResponse(request, 'news/category_posts.html', context)
 
 
 # 🔄 ФУНКЦИИ ДЛЯ УПРАВЛЕНИЯ АВТОРАМИ
@@ -218,7 +225,7 @@ def become_author(request):
     authors_group.permissions.set(post_permissions)
     logger.info(f"🔐 Назначено прав для модели Post: {post_permissions.count()}")
 
-    if not request.user.groups.filter(name='authors').exists():
+    if not GroupService.is_author(request.user):
         request.user.groups.add(authors_group)
 
         # Создаем профиль автора если его нет
@@ -236,7 +243,7 @@ def become_author(request):
 @login_required
 def author_dashboard(request):
     """Дашборд автора"""
-    if not request.user.groups.filter(name='authors').exists():
+    if not GroupService.is_author(request.user):
         messages.error(request, 'Доступно только для авторов')
         return redirect('news_list')
 
@@ -266,29 +273,34 @@ def author_dashboard(request):
 
 
 # 🔄 ОСНОВНЫЕ КЛАССЫ-ПРЕДСТАВЛЕНИЯ
-class NewsList(ListView):
+@method_decorator(cache_anonymous_page(lambda request: [POSTS_NAMESPACE, CATEGORY_NAMES_NAMESPACE]), name='dispatch')
+class NewsList(CachedPaginationMixin, CursorPaginationMixin, ListView):
     model = Post
     template_name = 'news/news_list.html'
     context_object_name = 'news_list'
     paginate_by = 10
 
     def get_queryset(self):
+        # Списки показывают сохраненные заголовок и анонс, content не загружается
         return Post.objects.filter(post_type=Post.NEWS).select_related(
             'author__user'
-        ).prefetch_related('categories').order_by('-created_at')
+        ).prefetch_related('categories').defer('content').order_by('-created_at')
+
+    def get_total_count(self, queryset):
+        return CountService.news_total()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.annotate(
-            posts_count=Count('post')
-        )
-        context['total_news'] = Post.objects.filter(post_type=Post.NEWS).count()
+        context['total_news'] = context['paginator'].count
 
-        logger.info(
-            f"📰 Страница новостей: {context['news_list'].count()} новостей, {context['categories'].count()} категорий")
+        logger.info(f"📰 Страница новостей: {len(context['news_list'])} новостей")
         return context
 
 
+@method_decorator(
+    cache_anonymous_page(lambda request, pk: [POSTS_NAMESPACE, post_namespace(pk), CATEGORY_NAMES_NAMESPACE]),
+    name='dispatch'
+)
 class NewsDetail(DetailView):
     model = Post
     template_name = 'news/news_detail.html'
@@ -299,9 +311,14 @@ class NewsDetail(DetailView):
             'author__user'
         ).prefetch_related('categories')
 
+    def get_object(self, queryset=None):
+        pk = self.kwargs[self.pk_url_kwarg]
+        return page_cache.get_or_set(
+            f'news_detail:{pk}', [post_namespace(pk)], lambda: super(NewsDetail, self).get_object(queryset)
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
 
         # Добавляем информацию о подписках пользователя
         if self.request.user.is_authenticated:
@@ -317,13 +334,13 @@ class NewsDetail(DetailView):
         similar_posts = Post.objects.filter(
             categories__in=self.object.categories.all(),
             post_type=Post.NEWS
-        ).exclude(pk=self.object.pk).distinct()[:5]
+        ).exclude(pk=self.object.pk).defer('content').distinct()[:5]
         context['similar_posts'] = similar_posts
 
         return context
 
 
-class NewsSearch(ListView):
+class NewsSearch(CursorPaginationMixin, ListView):
     model = Post
     template_name = 'news/news_search.html'
     context_object_name = 'news_list'
@@ -332,17 +349,16 @@ class NewsSearch(ListView):
     def get_queryset(self):
         queryset = Post.objects.filter(post_type=Post.NEWS).select_related(
             'author__user'
-        ).prefetch_related('categories').order_by('-created_at')
+        ).prefetch_related('categories').defer('content').order_by('-created_at')
         self.filterset = PostFilter(self.request.GET, queryset=queryset)
         return self.filterset.qs
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['filterset'] = self.filterset
-        context['categories'] = Category.objects.all()
         context['search_query'] = self.request.GET.get('title', '')
 
-        logger.info(f"🔍 Поиск новостей: найдено {context['news_list'].count()} результатов")
+        logger.info(f"🔍 Поиск новостей: на странице {len(context['news_list'])} результатов")
         return context
 
 
@@ -354,15 +370,14 @@ class NewsCreate(PermissionRequiredMixinWithMessage, AuthRequiredMixin, AuthorRe
     template_name = 'news/news_edit.html'
     permission_required = 'news.add_post'
 
-    def get_form_kwargs(self):
-        kwargs = super().get_form_kwargs()
-        kwargs['user'] = self.request.user
-        return kwargs
-
     def form_valid(self, form):
         post = form.save(commit=False)
         post.post_type = Post.NEWS
-        author, created = Author.objects.get_or_create(user=self.request.user)
+        # Тот же объект автора, что проверял лимит в NewsLimitMixin: счетчик квоты уже прочитан
+        if hasattr(self.request.user, 'author'):
+            author = self.request.user.author
+        else:
+            author, created = Author.objects.get_or_create(user=self.request.user)
         post.author = author
 
         response = super().form_valid(form)
@@ -383,14 +398,13 @@ class NewsCreate(PermissionRequiredMixinWithMessage, AuthRequiredMixin, AuthorRe
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Создание новости'
-        context['categories'] = Category.objects.all()
 
         # Добавляем информацию о лимите
         if hasattr(self.request.user, 'author'):
-            news_count = self.request.user.author.get_news_count_today()
+            author = self.request.user.author
             context.update({
-                'news_count_today': news_count,
-                'news_remaining': max(0, 3 - news_count)
+                'news_count_today': NewsQuotaService.used(author),
+                'news_remaining': NewsQuotaService.remaining(author)
             })
 
         return context
@@ -413,7 +427,6 @@ class NewsUpdate(PermissionRequiredMixinWithMessage, AuthRequiredMixin, AuthorRe
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Редактирование новости'
-        context['categories'] = Category.objects.all()
         return context
 
 
@@ -429,7 +442,6 @@ class NewsDelete(PermissionRequiredMixinWithMessage, AuthRequiredMixin, AuthorRe
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
         return context
 
     def delete(self, request, *args, **kwargs):
@@ -464,7 +476,6 @@ class ArticleCreate(PermissionRequiredMixinWithMessage, AuthRequiredMixin, Autho
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Создание статьи'
-        context['categories'] = Category.objects.all()
         return context
 
 
@@ -485,7 +496,6 @@ class ArticleUpdate(PermissionRequiredMixinWithMessage, AuthRequiredMixin, Autho
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Редактирование статьи'
-        context['categories'] = Category.objects.all()
         return context
 
 
@@ -501,7 +511,6 @@ class ArticleDelete(PermissionRequiredMixinWithMessage, AuthRequiredMixin, Autho
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
         return context
 
     def delete(self, request, *args, **kwargs):
@@ -582,6 +591,8 @@ def resend_activation_email(request):
 
 
 # 🔄 ДОПОЛНИТЕЛЬНЫЕ ПРЕДСТАВЛЕНИЯ
+# Главная показывает сводку категорий с числом постов и подписчиков, поэтому зависит от нее целиком
+@method_decorator(cache_anonymous_page(lambda request: [POSTS_NAMESPACE, CATEGORIES_NAMESPACE]), name='dispatch')
 class HomePageView(ListView):
     """Главная страница с последними новостями"""
     model = Post
@@ -590,16 +601,16 @@ class HomePageView(ListView):
     paginate_by = 5
 
     def get_queryset(self):
-        return Post.objects.filter(post_type=Post.NEWS).select_related(
-            'author__user'
-        ).prefetch_related('categories').order_by('-created_at')[:10]
+        return page_cache.get_or_set('home_latest_news', [POSTS_NAMESPACE], lambda: list(
+            Post.objects.filter(post_type=Post.NEWS).select_related(
+                'author__user'
+            ).prefetch_related('categories').defer('content').order_by('-created_at')[:10]
+        ))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.annotate(
-            posts_count=Count('post')
-        )[:8]
-        context['total_categories'] = Category.objects.count()
+        context['categories'] = CategorySummaryService.summary()[:8]
+        context['total_categories'] = CountService.categories_total()
         return context
 
 
@@ -607,9 +618,8 @@ class HomePageView(ListView):
 def profile(request):
     """Профиль пользователя"""
     context = {
-        'is_author': request.user.groups.filter(name='authors').exists(),
+        'is_author': GroupService.is_author(request.user),
         'subscriptions_count': Subscription.objects.filter(user=request.user).count(),
-        'categories': Category.objects.all()
     }
 
     if hasattr(request.user, 'author'):
@@ -620,4 +630,84 @@ def profile(request):
             'news_today': author.get_news_count_today()
         })
 
-    return render(request, 'accounts/profile.html', context)
\ No newline at end of file
+    return render(request, 'accounts/profile.html', context)
+
+
+# 🆕 РЕЙТИНГ АВТОРОВ
+def author_leaderboard(request):
+    """Страница с лучшими авторами и местом текущего пользователя"""
+    my_rank = None
+    if request.user.is_authenticated:
+        author_id = Author.objects.filter(user_id=request.user.id).values_list('pk', flat=True).first()
+        if author_id is not None:
+            my_rank = leaderboard.rank(author_id)
+
+    context = {
+        'leaders': leaderboard.top(getattr(settings, 'LEADERBOARD_SIZE', 20)),
+        'my_rank': my_rank,
+        'total_authors': len(leaderboard),
+    }
+    return render(request, 'news/leaderboard.html', context)
+
+
+def author_leaderboard_json(request):
+    """JSON: топ авторов (?limit=, до 100) и место автора (?author=<id>)"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 100)
+        author_id = int(request.GET['author']) if request.GET.get('author') else None
+    except ValueError:
+        return JsonResponse({'error': 'limit и author должны быть целыми числами'}, status=400)
+
+    data = {
+        'total': len(leaderboard),
+        'top': leaderboard.top(limit),
+    }
+    if author_id is not None:
+        data['author'] = leaderboard.rank(author_id)
+    return JsonResponse(data)
+
+
+# 🆕 ЛЕНТА НОВОСТЕЙ ДЛЯ API
+def news_feed_json(request):
+    """JSON: новости по курсору (?cursor=, ?category=<id>, ?limit= до 50)"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+        category_id = int(request.GET['category']) if request.GET.get('category') else None
+    except ValueError:
+        return JsonResponse({'error': 'limit и category должны быть целыми числами'}, status=400)
+
+    posts = Post.objects.filter(post_type=Post.NEWS).select_related('author__user').defer('content')
+    if category_id is not None:
+        posts = posts.filter(categories=category_id)
+
+    try:
+        page = CursorPaginator(posts, limit).page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Неверный курсор'}, status=400)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': post.pk,
+                'title': post.censored_title,
+                'preview': post.preview(),
+                'author': post.author.user.username,
+                'rating': post.rating,
+                'created_at': post.created_at.isoformat(),
+                'url': request.build_absolute_uri(reverse('news_detail', args=[post.pk])),
+            }
+            for post in page
+        ],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+# 🆕 СТАТИСТИКА КЭША СТРАНИЦ
+@staff_member_required
+def cache_stats(request):
+    """JSON: попадания и промахи версионированного кэша (?reset=1 обнуляет счетчики)"""
+    stats = page_cache.stats()
+    if request.GET.get('reset'):
+        page_cache.reset_stats()
+    return JsonResponse(stats)